@@ -1,13 +1,39 @@
 from abc import ABC, abstractmethod
+import numpy as np
 import pandas as pd
 
 class BaseAnalyzer(ABC):
-    """Abstract base class for analysis strategies."""
+    """
+    Abstract base class for analysis strategies.
+
+    Analyzers are fed incrementally: `update` is called once per chunk of parsed values
+    (in message order) and `finalize` returns the results, so the full series never
+    has to be held in memory.
+    """
+
+    # Whether `update` uses the values at all; callers may skip feeding analyzers that don't
+    needs_values: bool = True
+
+    @abstractmethod
+    def update(self, values: np.ndarray):
+        """
+        Accumulates a chunk of parsed values.
+
+        Args:
+            values: The 'parsed_value' column of the next chunk of messages.
+        """
+        pass
 
     @abstractmethod
+    def finalize(self) -> dict:
+        """
+        Returns the analysis results accumulated from all chunks as a dictionary.
+        """
+        pass
+
     def analyze(self, df: pd.DataFrame) -> dict:
         """
-        Analyzes the DataFrame and returns the results as a dictionary.
+        Analyzes the DataFrame as a single chunk and returns the results as a dictionary.
 
         Args:
             df: The DataFrame to analyze. It must have a 'parsed_value' column.
@@ -15,4 +41,7 @@ class BaseAnalyzer(ABC):
         Returns:
             A dictionary containing the analysis results.
         """
-        pass
+        if 'parsed_value' not in df.columns:
+            return {}
+        self.update(df['parsed_value'].to_numpy())
+        return self.finalize()
@@ -1,23 +1,28 @@
 from .base_analyzer import BaseAnalyzer
-import pandas as pd
+from .running_stats import RunningStats
 import numpy as np
 
 class BasicStatsAnalyzer(BaseAnalyzer):
     """Analyzer for the 'basic_stats' type. Calculates basic statistics."""
 
-    def analyze(self, df: pd.DataFrame) -> dict:
+    def __init__(self):
+        self._stats = RunningStats()
+        self._num_values = 0
+
+    def update(self, values: np.ndarray):
+        """
+        Accumulates count, sum, sum of squares, max and min of the chunk.
+        """
+        self._num_values += len(values)
+        self._stats.update(values)
+
+    def finalize(self) -> dict:
         """
         Calculates basic statistics (mean, std dev, max, min).
         """
-        if 'parsed_value' not in df.columns or df['parsed_value'].empty:
+        if self._num_values == 0:
             return {}
 
-        series = df['parsed_value']
-        stats = {
-            "mean": series.mean(),
-            "std": series.std(),
-            "max": series.max(),
-            "min": series.min(),
-            "count": series.count()
-        }
+        stats = self._stats.to_dict()
+        stats["count"] = self._stats.count
         return {"basic_stats": stats}
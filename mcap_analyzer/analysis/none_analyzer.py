@@ -1,10 +1,18 @@
 from .base_analyzer import BaseAnalyzer
-import pandas as pd
+import numpy as np
 
 class NoneAnalyzer(BaseAnalyzer):
     """Analyzer for the 'none' type. Performs no analysis."""
 
-    def analyze(self, df: pd.DataFrame) -> dict:
+    needs_values = False
+
+    def update(self, values: np.ndarray):
+        """
+        Ignores the values.
+        """
+        pass
+
+    def finalize(self) -> dict:
         """
         Performs no analysis and returns an empty dictionary.
         """
@@ -0,0 +1,83 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the NumPy path below is used instead
+    njit = None
+
+if njit is not None:
+    @njit(cache=True)
+    def _chunk_moments_kernel(values, skip_nan):
+        """Single-pass Welford update over a chunk. Returns (count, mean, M2, min, max)."""
+        count = 0
+        mean = 0.0
+        m2 = 0.0
+        lo = np.inf
+        hi = -np.inf
+        for x in values:
+            if skip_nan and np.isnan(x):
+                continue
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+            lo = min(lo, x)
+            hi = max(hi, x)
+        return count, mean, m2, lo, hi
+else:
+    _chunk_moments_kernel = None
+
+class RunningStats:
+    """
+    Accumulates mean, std dev, max and min over a stream of value chunks.
+
+    The variance is tracked as a running mean and sum of squared deviations (M2), as in
+    Welford's algorithm, so it stays accurate for values with a large offset (e.g. timestamps).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray):
+        """Adds a chunk of values to the accumulator, ignoring NaN entries."""
+        values = np.asarray(values)
+        # Integer and boolean chunks cannot contain NaN, so the NaN checks are skipped for them
+        may_have_nan = values.dtype.kind not in 'biu'
+        values = values.astype(np.float64, copy=False)
+        if _chunk_moments_kernel is not None:
+            self.add_moments(*_chunk_moments_kernel(values, may_have_nan))
+            return
+
+        if may_have_nan:
+            nan_mask = np.isnan(values)
+            if nan_mask.any():
+                values = values[~nan_mask]
+        if values.size == 0:
+            return
+        mean = values.mean()
+        centered = values - mean
+        self.add_moments(values.size, mean, np.dot(centered, centered), values.min(), values.max())
+
+    def add_moments(self, count: int, mean: float, m2: float, min_value: float, max_value: float):
+        """Merges the moments (count, mean, M2, min, max) of a chunk into the accumulator."""
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, min_value)
+        self.max = max(self.max, max_value)
+
+    def to_dict(self) -> dict:
+        """Returns the accumulated statistics; NaN for anything undefined."""
+        if self.count == 0:
+            return {"mean": np.nan, "std": np.nan, "max": np.nan, "min": np.nan}
+        # Sample standard deviation (ddof=1)
+        std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+        return {"mean": self.mean, "std": std, "max": self.max, "min": self.min}
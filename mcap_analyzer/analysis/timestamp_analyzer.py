@@ -1,8 +1,81 @@
 from .base_analyzer import BaseAnalyzer
-import pandas as pd
+from .running_stats import RunningStats
+from fractions import Fraction
 import numpy as np
 import re
 
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; the NumPy path below is used instead
+    njit = None
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _jitter_stats_kernel(timestamps_ns, t_start_ns, period_ns, half_period_ns, inv_period_ns):
+        """
+        Fused deviation + reduction loops. Returns (mean, M2, min, max) of the deviation in ns.
+        The deviation is recomputed in the second pass rather than stored, and M2 is summed
+        around the chunk mean, which keeps it as accurate as a Welford update while both
+        passes stay parallel reductions.
+        """
+        n = timestamps_ns.shape[0]
+        total = 0.0
+        lo = np.inf
+        hi = -np.inf
+        for i in prange(n):
+            x = timestamps_ns[i] - t_start_ns + half_period_ns
+            # Floored modulo via multiply + floor instead of a division
+            d = (x - period_ns * np.floor(x * inv_period_ns)) - half_period_ns
+            total += d
+            lo = min(lo, d)
+            hi = max(hi, d)
+        mean = total / n
+
+        m2 = 0.0
+        for i in prange(n):
+            x = timestamps_ns[i] - t_start_ns + half_period_ns
+            d = (x - period_ns * np.floor(x * inv_period_ns)) - half_period_ns
+            m2 += (d - mean) * (d - mean)
+        return mean, m2, lo, hi
+
+    @njit(parallel=True, cache=True)
+    def _jitter_stats_int_kernel(timestamps_ns, t_start_ns, scale, period_num):
+        """
+        Exact integer variant of _jitter_stats_kernel for a rational period num/den.
+        With scale = 2*den, the deviation is computed in units of 1/(2*den) ns as
+        (((rel mod num) * 2*den + num) mod 2*num) - num. Returns (mean, M2, min, max) in
+        those units.
+        """
+        n = timestamps_ns.shape[0]
+        period_num2 = 2 * period_num
+        total = 0.0
+        lo = np.inf
+        hi = -np.inf
+        for i in prange(n):
+            r = (timestamps_ns[i] - t_start_ns) % period_num
+            d = float((r * scale + period_num) % period_num2 - period_num)
+            total += d
+            lo = min(lo, d)
+            hi = max(hi, d)
+        mean = total / n
+
+        m2 = 0.0
+        for i in prange(n):
+            r = (timestamps_ns[i] - t_start_ns) % period_num
+            d = float((r * scale + period_num) % period_num2 - period_num)
+            m2 += (d - mean) * (d - mean)
+        return mean, m2, lo, hi
+else:
+    _jitter_stats_kernel = None
+    _jitter_stats_int_kernel = None
+
+_FREQ_RE = re.compile(r'freq:([\d\.]+)')
+
+# Largest period denominator for which the deviation is computed in exact int64 arithmetic.
+# The offset is reduced modulo num before it is scaled by 2*den, so the intermediate values
+# stay below num * (2*den + 1) however far apart the timestamps are.
+_MAX_EXACT_PERIOD_DENOMINATOR = 1000
+
 class TimestampAnalyzer(BaseAnalyzer):
     """Analyzer for the 'timestamp' type. Calculates statistics on timestamps."""
 
@@ -15,58 +88,127 @@ class TimestampAnalyzer(BaseAnalyzer):
         if self.freq_hz <= 0:
             raise ValueError("Frequency must be a positive value.")
         self.expected_period_ns = 1e9 / self.freq_hz
+        # Constants of the deviation formula, precomputed for the per-chunk hot path
+        self._half_period_ns = self.expected_period_ns * 0.5
+        self._inv_period_ns = 1.0 / self.expected_period_ns
+        # Exact period num/den [ns], e.g. 10000000/1 for 100 Hz or 100000000/3 for 30 Hz.
+        # When the denominator is small the modulo is done in int64 instead of float64.
+        period_ns = Fraction(10**9) / Fraction(repr(self.freq_hz))
+        if (period_ns.denominator <= _MAX_EXACT_PERIOD_DENOMINATOR
+                and period_ns.numerator * (2 * period_ns.denominator + 1) < 2**63):
+            self._period_num = period_ns.numerator
+            self._period_scale = 2 * period_ns.denominator
+        else:
+            self._period_num = None
+            self._period_scale = None
+
+        self._num_timestamps = 0
+        self._t_start_ns = None
+        self._last_ns = None
+        self._period_stats = RunningStats()
+        self._frequency_stats = RunningStats()
+        self._jitter_stats = RunningStats()
 
     def _parse_freq(self, config_str: str) -> float:
         """Parses the frequency from the 'timestamp(freq:HZ)' string."""
-        match = re.search(r'freq:([\d\.]+)', config_str)
+        match = _FREQ_RE.search(config_str)
         if not match:
             raise ValueError(f"Frequency not specified in config: {config_str}")
         return float(match.group(1))
 
-    def _calculate_stats(self, series: pd.Series) -> dict:
-        """Calculates statistics from a pandas Series."""
-        if series.empty:
-            return {"mean": np.nan, "std": np.nan, "max": np.nan, "min": np.nan}
-        return {
-            "mean": series.mean(),
-            "std": series.std(),
-            "max": series.max(),
-            "min": series.min(),
-        }
+    def _update_jitter_stats(self, timestamps_ns: np.ndarray):
+        """Accumulates the deviation from the ideal grid anchored at the first timestamp [s]."""
+        if self._period_num is not None:
+            self._update_jitter_stats_exact(timestamps_ns)
+            return
 
-    def analyze(self, df: pd.DataFrame) -> dict:
+        if _jitter_stats_kernel is not None:
+            mean, m2, min_, max_ = _jitter_stats_kernel(
+                timestamps_ns, self._t_start_ns, self.expected_period_ns, self._half_period_ns, self._inv_period_ns)
+            self._jitter_stats.add_moments(timestamps_ns.size, mean / 1e9, m2 / 1e18, min_ / 1e9, max_ / 1e9)
+            return
+
+        # Recommended implementation from spec:
+        # deviation = ((t_i_ns - t_start_ns + T_expected_ns/2) % T_expected_ns) - (T_expected_ns/2)
+        # This keeps the deviation within the range [-T/2, +T/2]
+        # The floored modulo (which keeps '%' semantics for out-of-order timestamps) is computed
+        # as x - T * floor(x / T) with a precomputed 1/T, in place on float64 buffers.
+        deviation = np.add(timestamps_ns - self._t_start_ns, self._half_period_ns)
+        wraps = deviation * self._inv_period_ns
+        np.floor(wraps, out=wraps)
+        wraps *= self.expected_period_ns
+        deviation -= wraps
+        deviation -= self._half_period_ns
+        deviation /= 1e9
+        self._jitter_stats.update(deviation)
+
+    def _update_jitter_stats_exact(self, timestamps_ns: np.ndarray):
         """
-        Calculates period, frequency, and jitter/drift from timestamp data.
+        Same deviation as _update_jitter_stats, with the modulo done exactly in int64.
+        The deviation is scaled by 2*den so that both T = num/den and T/2 are integers:
+        deviation * 2*den = ((rel * 2*den + num) mod 2*num) - num
+                          = (((rel mod num) * 2*den + num) mod 2*num) - num
+        Reducing rel modulo num first keeps the products in range for any timestamp spread.
         """
-        if 'parsed_value' not in df.columns or len(df['parsed_value']) < 2:
-            return {}
+        num, scale = self._period_num, self._period_scale
+        if _jitter_stats_int_kernel is not None:
+            mean, m2, min_, max_ = _jitter_stats_int_kernel(timestamps_ns, self._t_start_ns, scale, num)
+            unit = scale * 1e9
+            self._jitter_stats.add_moments(
+                timestamps_ns.size, mean / unit, m2 / (unit * unit), min_ / unit, max_ / unit)
+            return
 
-        timestamps_ns = df['parsed_value'].astype(np.int64)
+        scaled = timestamps_ns - self._t_start_ns
+        np.mod(scaled, num, out=scaled)
+        scaled *= scale
+        scaled += num
+        np.mod(scaled, 2 * num, out=scaled)
+        scaled -= num
+        deviation = scaled / (scale * 1e9)
+        self._jitter_stats.update(deviation)
 
-        # Period (s)
-        period_ns = timestamps_ns.diff().dropna()
-        period_s = period_ns / 1e9
-        period_stats = self._calculate_stats(period_s)
+    def _update_period_stats(self, period_ns: np.ndarray):
+        """Accumulates period [s] and frequency [Hz] statistics from timestamp differences [ns]."""
+        self._period_stats.update(period_ns / 1e9)
 
         # Frequency (Hz)
         # Avoid division by zero
-        frequency_hz = (1e9 / period_ns[period_ns > 0]).dropna()
-        frequency_stats = self._calculate_stats(frequency_hz)
+        self._frequency_stats.update(1e9 / period_ns[period_ns > 0])
 
-        # Jitter/Drift from Time of Start (ToS) [s]
-        t_start_ns = timestamps_ns.iloc[0]
+    def update(self, values: np.ndarray):
+        """
+        Accumulates period, frequency, and jitter/drift statistics from a chunk of timestamps.
+        """
+        # No copy when the chunk already is an int64 array
+        timestamps_ns = np.asarray(values).astype(np.int64, copy=False)
+        if timestamps_ns.size == 0:
+            return
 
-        # Recommended implementation from spec:
-        # deviation = ((t_i_ns - t_start_ns + T_expected_ns/2) % T_expected_ns) - (T_expected_ns/2)
-        # This keeps the deviation within the range [-T/2, +T/2]
-        deviation_ns = ((timestamps_ns - t_start_ns + self.expected_period_ns / 2) % self.expected_period_ns) - (self.expected_period_ns / 2)
-        deviation_s = deviation_ns / 1e9
-        jitter_stats = self._calculate_stats(deviation_s)
+        if self._t_start_ns is None:
+            # Jitter/Drift is measured from the Time of Start (ToS)
+            self._t_start_ns = timestamps_ns[0]
+
+        # Period (s). The gap to the last timestamp of the previous chunk is handled on its own
+        # rather than via np.diff(prepend=...), which would copy the whole chunk.
+        if self._last_ns is not None:
+            self._update_period_stats(np.array([timestamps_ns[0] - self._last_ns]))
+        self._update_period_stats(np.diff(timestamps_ns))
+        self._last_ns = timestamps_ns[-1]
+        self._num_timestamps += timestamps_ns.size
+
+        self._update_jitter_stats(timestamps_ns)
+
+    def finalize(self) -> dict:
+        """
+        Calculates period, frequency, and jitter/drift from the accumulated timestamp data.
+        """
+        if self._num_timestamps < 2:
+            return {}
 
         return {
             "specified_frequency_hz": self.freq_hz,
             "expected_period_s": self.expected_period_ns / 1e9,
-            "period_s": period_stats,
-            "frequency_hz": frequency_stats,
-            "jitter_drift_s": jitter_stats,
+            "period_s": self._period_stats.to_dict(),
+            "frequency_hz": self._frequency_stats.to_dict(),
+            "jitter_drift_s": self._jitter_stats.to_dict(),
         }
@@ -2,6 +2,12 @@ import yaml
 from pathlib import Path
 import sys
 
+try:
+    # libyaml-backed loader; much faster than the pure-Python SafeLoader
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
 def load_config(config_path: Path) -> dict:
     """
     Loads a YAML configuration file from the specified path and returns it as a dictionary.
@@ -22,7 +28,7 @@ def load_config(config_path: Path) -> dict:
 
     try:
         with open(config_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+            return yaml.load(f.read(), Loader=_SafeLoader)
     except yaml.YAMLError as e:
         print(f"Error: Invalid YAML format in configuration file: {e}", file=sys.stderr)
         raise
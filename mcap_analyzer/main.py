@@ -1,20 +1,35 @@
 import argparse
+import os
 from pathlib import Path
 import sys
-from typing import List, Dict, Any
-import pandas as pd
+from typing import List, Dict, Any, Iterator, Optional, TYPE_CHECKING
+
+# Parallelism comes from decoding MCAP files in worker processes, so keep the BLAS/OpenMP
+# pools of NumPy (and numexpr's, if installed) single-threaded to avoid oversubscribing the
+# cores (workers x threads). This has to happen before numpy is first imported; explicit
+# user settings are kept.
+for _var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
 
 from mcap_analyzer.config_loader import load_config
-from mcap_analyzer.utils import create_output_directory
-from mcap_analyzer.reporter import Reporter
-from mcap_analyzer.mcap_parser import McapParser
-from mcap_analyzer.analysis.base_analyzer import BaseAnalyzer
-from mcap_analyzer.analysis.none_analyzer import NoneAnalyzer
-from mcap_analyzer.analysis.basic_stats_analyzer import BasicStatsAnalyzer
-from mcap_analyzer.analysis.timestamp_analyzer import TimestampAnalyzer
-
-def get_analyzer(analysis_type: str) -> BaseAnalyzer:
-    """Factory function to return the appropriate analyzer instance based on the analysis_type string."""
+from mcap_analyzer.utils import create_output_directory, INTERMEDIATE_FORMATS
+
+# pandas, the analyzers, the MCAP reader and the reporter (pyarrow) are imported where they
+# are used, so '--help' and configuration errors do not pay for importing them.
+if TYPE_CHECKING:
+    import pandas as pd
+    from mcap_analyzer.reporter import Reporter
+    from mcap_analyzer.analysis.base_analyzer import BaseAnalyzer
+
+def get_analyzer(analysis_type: str) -> 'BaseAnalyzer':
+    """
+    Factory function to return the appropriate analyzer instance based on the analysis_type string.
+    Analyzers accumulate state while being fed, so every task gets its own instance.
+    """
+    from mcap_analyzer.analysis.none_analyzer import NoneAnalyzer
+    from mcap_analyzer.analysis.basic_stats_analyzer import BasicStatsAnalyzer
+    from mcap_analyzer.analysis.timestamp_analyzer import TimestampAnalyzer
+
     if analysis_type.startswith('timestamp'):
         return TimestampAnalyzer(analysis_type)
     elif analysis_type == 'basic_stats':
@@ -25,6 +40,16 @@ def get_analyzer(analysis_type: str) -> BaseAnalyzer:
         print(f"Warning: Unknown analysis_type '{analysis_type}'. Treating as 'none'.", file=sys.stderr)
         return NoneAnalyzer()
 
+def _iter_mcap_files(directory: str) -> Iterator[Path]:
+    """Recursively yields the .mcap files below a directory without following symlinked directories."""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # DirEntry caches the file type from the directory listing, so no extra stat calls
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_mcap_files(entry.path)
+            elif entry.name.endswith('.mcap'):
+                yield Path(entry.path)
+
 def get_mcap_files(source_path: Path) -> List[Path]:
     """Gets a list of MCAP files from the specified path."""
     if not source_path.exists():
@@ -32,7 +57,7 @@ def get_mcap_files(source_path: Path) -> List[Path]:
         sys.exit(1)
 
     if source_path.is_dir():
-        files = sorted(list(source_path.glob('**/*.mcap')))
+        files = sorted(_iter_mcap_files(str(source_path)))
         if not files:
             print(f"Error: No MCAP files found in the directory: {source_path}", file=sys.stderr)
             sys.exit(1)
@@ -46,7 +71,7 @@ def get_mcap_files(source_path: Path) -> List[Path]:
         print(f"Error: Invalid path specified: {source_path}", file=sys.stderr)
         sys.exit(1)
 
-def process_task(df: pd.DataFrame, task: Dict[str, Any], reporter: Reporter):
+def process_task(df: 'pd.DataFrame', task: Dict[str, Any], reporter: 'Reporter'):
     """Analyzes a DataFrame based on a task config and records the result."""
     if df.empty:
         print(f"Warning: DataFrame for task '{task['id']}' is empty. Skipping analysis.")
@@ -58,7 +83,7 @@ def process_task(df: pd.DataFrame, task: Dict[str, Any], reporter: Reporter):
     reporter.add_analysis_result(task['id'], task['topic_name'], analysis_type, result)
 
 
-def run_analysis(mcap_source_path: Path, config_path: Path):
+def run_analysis(mcap_source_path: Path, config_path: Path, intermediate_format: str = 'parquet', threads: Optional[int] = None):
     """The main function that executes the entire analysis process."""
     try:
         config = load_config(config_path)
@@ -70,29 +95,68 @@ def run_analysis(mcap_source_path: Path, config_path: Path):
         sys.exit(1)
 
     mcap_files = get_mcap_files(mcap_source_path)
+
+    from mcap_analyzer.reporter import Reporter
+    from mcap_analyzer.mcap_parser import McapReader
+
     output_dir = create_output_directory()
-    reporter = Reporter(output_dir)
+    reporter = Reporter(output_dir, intermediate_format)
 
     print(f"Output directory: {output_dir}")
     print(f"Target MCAP files: {[str(f) for f in mcap_files]}")
 
+    tasks: Dict[str, Dict[str, Any]] = {}
+    analyzers: Dict[str, 'BaseAnalyzer'] = {}
     for task in config['analyses']:
         try:
-            print(f"\n--- Starting analysis task '{task['id']}' ---")
-
-            parser = McapParser(task)
-            df = parser.process_mcap_files(mcap_files)
-
-            if df.empty:
-                print(f"Warning: No messages found for topic '{task['topic_name']}' or they could not be processed. Skipping task.")
+            analyzer = get_analyzer(task.get('analysis_type', 'none'))
+            if not analyzer.needs_values and intermediate_format == 'none':
+                # The intermediate file is the only output of such a task, so don't even parse it
+                print(f"Warning: Task '{task['id']}' performs no analysis and intermediate files are disabled. Skipping task.")
                 continue
+            analyzers[task['id']] = analyzer
+            tasks[task['id']] = task
+        except Exception as e:
+            print(f"Error: An unexpected error occurred while preparing task '{task.get('id', 'N/A')}': {e}", file=sys.stderr)
 
-            reporter.save_intermediate_csv(task['id'], df)
-            process_task(df, task, reporter)
+    # Read every MCAP file once and demultiplex its messages to all tasks
+    reader = McapReader(list(tasks.values()))
+    tasks = {processor.task_id: tasks[processor.task_id] for processor in reader.processors}
+    num_rows = dict.fromkeys(tasks, 0)
+    failed_task_ids = set()
+    # Tasks whose intermediate file could not be written; their analysis still goes on
+    failed_intermediate_ids = set()
 
-        except Exception as e:
-            print(f"Error: An unexpected error occurred while processing task '{task.get('id', 'N/A')}': {e}", file=sys.stderr)
+    print(f"\n--- Starting analysis tasks {list(tasks)} ---")
+    try:
+        for task_id, chunk in reader.iter_chunks(mcap_files, max_workers=threads):
+            if task_id in failed_task_ids:
+                continue
+            if task_id not in failed_intermediate_ids:
+                try:
+                    reporter.save_intermediate(task_id, chunk)
+                except Exception as e:
+                    print(f"Error: Failed to write the intermediate file of task '{task_id}'; it is incomplete: {e}", file=sys.stderr)
+                    failed_intermediate_ids.add(task_id)
+            try:
+                analyzer = analyzers[task_id]
+                if analyzer.needs_values:
+                    analyzer.update(chunk.column('parsed_value').to_numpy(zero_copy_only=False))
+                num_rows[task_id] += chunk.num_rows
+            except Exception as e:
+                print(f"Error: An unexpected error occurred while processing task '{task_id}': {e}", file=sys.stderr)
+                failed_task_ids.add(task_id)
+    finally:
+        # Intermediate files are only readable once closed, even if the run is aborted
+        reporter.close_intermediates()
+
+    for task_id, task in tasks.items():
+        if task_id in failed_task_ids:
             continue
+        if num_rows[task_id] == 0:
+            print(f"Warning: No messages found for topic '{task['topic_name']}' or they could not be processed. Skipping task '{task_id}'.")
+            continue
+        reporter.add_analysis_result(task_id, task['topic_name'], task.get('analysis_type', 'none'), analyzers[task_id].finalize())
 
     reporter.print_console_report()
     reporter.write_markdown_report()
@@ -100,7 +164,7 @@ def run_analysis(mcap_source_path: Path, config_path: Path):
 
 
 def run_analysis_from_csv(csv_source_path: Path, config_path: Path):
-    """The main function that executes the entire analysis process from CSV files."""
+    """The main function that executes the entire analysis process from intermediate CSV or Parquet files."""
     try:
         config = load_config(config_path)
         if 'analyses' not in config or not isinstance(config['analyses'], list):
@@ -114,26 +178,37 @@ def run_analysis_from_csv(csv_source_path: Path, config_path: Path):
         print(f"Error: The specified CSV source is not a directory: {csv_source_path}", file=sys.stderr)
         sys.exit(1)
 
+    import pandas as pd
+    from mcap_analyzer.reporter import Reporter
+
     output_dir = create_output_directory()
     reporter = Reporter(output_dir)
 
     print(f"Output directory: {output_dir}")
-    print(f"Re-processing from CSVs in: {csv_source_path}")
+    print(f"Re-processing from intermediate files in: {csv_source_path}")
 
     for task in config['analyses']:
         task_id = task['id']
+        parquet_file_path = csv_source_path / f"{task_id}.parquet"
         csv_file_path = csv_source_path / f"{task_id}.csv"
 
-        if not csv_file_path.is_file():
-            print(f"Warning: Intermediate CSV file for task '{task_id}' not found at '{csv_file_path}'. Skipping task.", file=sys.stderr)
+        if parquet_file_path.is_file():
+            file_path = parquet_file_path
+        elif csv_file_path.is_file():
+            file_path = csv_file_path
+        else:
+            print(f"Warning: Intermediate CSV/Parquet file for task '{task_id}' not found in '{csv_source_path}'. Skipping task.", file=sys.stderr)
             continue
 
         try:
-            print(f"\n--- Starting analysis task '{task['id']}' from CSV ---")
-            df = pd.read_csv(csv_file_path)
+            print(f"\n--- Starting analysis task '{task['id']}' from {file_path.name} ---")
+            if file_path.suffix == '.parquet':
+                df = pd.read_parquet(file_path)
+            else:
+                df = pd.read_csv(file_path)
 
             if df.empty:
-                print(f"Warning: CSV file for task '{task['id']}' is empty. Skipping task.")
+                print(f"Warning: Intermediate file for task '{task['id']}' is empty. Skipping task.")
                 continue
 
             process_task(df, task, reporter)
@@ -152,14 +227,18 @@ def main():
     parser = argparse.ArgumentParser(description="ROS2 MCAP Data Analysis Tool")
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument("--mcap", dest="mcap_source", type=Path, help="Path to a single MCAP file or a directory of MCAP files.")
-    group.add_argument("--csv", dest="csv_source", type=Path, help="Path to a directory with intermediate CSV files to re-process.")
+    group.add_argument("--csv", dest="csv_source", type=Path, help="Path to a directory with intermediate CSV/Parquet files to re-process.")
+    parser.add_argument("--intermediate", choices=INTERMEDIATE_FORMATS, default='parquet', help="Format of the per-task intermediate files written in --mcap mode (default: parquet).")
+    parser.add_argument("--threads", type=int, default=None, metavar="N", help="Number of worker processes decoding MCAP files in parallel (default: number of CPUs).")
     parser.add_argument("config", type=Path, help="Path to the analysis configuration YAML file.")
     args = parser.parse_args()
+    if args.threads is not None and args.threads < 1:
+        parser.error("--threads must be a positive integer.")
 
     if args.csv_source:
         run_analysis_from_csv(args.csv_source, args.config)
     else:
-        run_analysis(args.mcap_source, args.config)
+        run_analysis(args.mcap_source, args.config, args.intermediate, args.threads)
 
 if __name__ == "__main__":
     main()
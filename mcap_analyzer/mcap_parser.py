@@ -1,162 +1,810 @@
+import os
 from pathlib import Path
-from typing import List, Dict, Any
-import pandas as pd
+from typing import List, Dict, Any, Deque, Iterator, Optional, Tuple, Callable
+from collections import Counter, defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+import contextlib
+import ast
+import functools
+import math
+import multiprocessing
+import operator
+import numpy as np
+import pyarrow as pa
 import struct
 import re
-from asteval import Interpreter
 from natsort import natsorted
 from tqdm import tqdm
 from mcap.reader import make_reader
 from mcap_ros2.decoder import DecoderFactory
 import sys
+import types
 
-class McapParser:
-    """A class to parse data from MCAP files and generate a DataFrame."""
+try:
+    import numexpr
+except ImportError:  # numexpr is optional; expressions are then evaluated with NumPy
+    numexpr = None
+
+# Number of rows handed to the analyzers/reporter at a time
+CHUNK_SIZE = 65_536
+# Read buffer for MCAP files; far larger than Python's 8 KiB default for sequential reads
+DEFAULT_BUFFER_SIZE = 4 << 20
+# Block size for pre-reading the next MCAP file where posix_fadvise is unavailable
+PREFETCH_BLOCK_SIZE = 16 << 20
+
+# Identifiers (possibly dotted field names) in parse_string
+_IDENT = re.compile(r'[a-zA-Z_][\w\.]*')
+_TYPE_DIRECTIVE = re.compile(r'type:(\w+)')
+_BYTE_DIRECTIVE = re.compile(r'byte:(\d+)-(\d+)(?:,type:(\w+))?')
+
+# Precompiled (little-endian) structs for the 'type' of a 'byte' directive
+_STRUCTS = {
+    type_name: struct.Struct(fmt) for type_name, fmt in {
+        'float64': '<d', 'float32': '<f', 'int64': '<q', 'uint64': '<Q',
+        'int32': '<i', 'uint32': '<I', 'int16': '<h', 'uint16': '<H',
+        'int8': '<b', 'uint8': '<B',
+    }.items()
+}
+
+# Names available to parse_string expressions besides the task's fields
+_SAFE_GLOBALS = {
+    '__builtins__': {},
+    'abs': abs, 'min': min, 'max': max, 'round': round, 'int': int, 'float': float,
+    'math': math,
+    **{name: getattr(math, name) for name in dir(math) if not name.startswith('_')},
+}
+
+# Syntax allowed in parse_string expressions: arithmetic, comparisons, calls and indexing
+_ALLOWED_EXPRESSION_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call,
+    ast.keyword, ast.Name, ast.Load, ast.Constant, ast.Attribute, ast.Subscript, ast.Slice,
+    ast.Tuple, ast.operator, ast.unaryop, ast.boolop, ast.cmpop,
+)
+
+def _compile_expression(expression: str) -> types.CodeType:
+    """
+    Compiles a parse_string expression for eval(). Only the syntax in _ALLOWED_EXPRESSION_NODES
+    and no dunder names/attributes are accepted, so the expression cannot reach Python internals.
+    """
+    tree = ast.parse(expression.strip(), mode='eval')
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_EXPRESSION_NODES):
+            raise ValueError(f"Unsupported syntax '{type(node).__name__}' in expression '{expression}'.")
+        name = node.attr if isinstance(node, ast.Attribute) else node.id if isinstance(node, ast.Name) else None
+        if name is not None and name.startswith('__'):
+            raise ValueError(f"Access to '{name}' is not allowed in expression '{expression}'.")
+    return compile(tree, '<parse_string>', 'eval')
+
+class _FieldMissing(Exception):
+    """Raised by `TaskProcessor.process_message` when a field cannot be read from a message."""
+
+    def __init__(self, field_name: str, error: Exception):
+        super().__init__(f"Failed to retrieve value for field '{field_name}': {error}")
+        self.field_name = field_name
+
+def _build_accessor(field_name: str) -> Callable[[Any], Any]:
+    """
+    Builds a function that retrieves a dot-separated (optionally indexed, e.g. 'points[0].x')
+    field from a message. Runs of plain attributes are resolved by a single attrgetter.
+    """
+    steps = []
+    attr_path = []
+    for attr in field_name.split('.'):
+        if '[' in attr and attr.endswith(']'):
+            attr_name, index = attr[:-1].split('[')
+            attr_path.append(attr_name)
+            steps.append(operator.attrgetter('.'.join(attr_path)))
+            steps.append(operator.itemgetter(int(index)))
+            attr_path = []
+        else:
+            attr_path.append(attr)
+    if attr_path:
+        steps.append(operator.attrgetter('.'.join(attr_path)))
+
+    if len(steps) == 1:
+        return steps[0]
+
+    def accessor(msg: Any) -> Any:
+        value = msg
+        for step in steps:
+            value = step(value)
+        return value
+    return accessor
+
+def _byte_buffer(raw_value: Any) -> Optional[Any]:
+    """Returns the value as a buffer that can be unpacked without a copy, or None if there is none."""
+    if isinstance(raw_value, bytes):
+        return raw_value
+    if (isinstance(raw_value, np.ndarray) and raw_value.dtype == np.uint8
+            and raw_value.ndim == 1 and raw_value.flags.c_contiguous):
+        return raw_value.data
+    return None
+
+# Column dtypes numexpr is used for. It has no unsigned or small integer types, and it
+# promotes float32 with float constants to float64 where NumPy keeps float32.
+_NUMEXPR_DTYPES = (np.dtype(np.int64), np.dtype(np.float64))
+
+# Per-row results that are converted into a typed array
+_NUMERIC_SCALAR_TYPES = (bool, int, float, np.bool_, np.integer, np.floating)
+
+def _values_to_array(values: List[Any]) -> np.ndarray:
+    """
+    Converts per-row parsed values into an array. Numbers get their common dtype (e.g. float64
+    for a mix of ints and floats, as for a pandas column); any other values, or ints beyond
+    the range of int64/uint64, are kept in an object array.
+    """
+    if values and all(isinstance(value, _NUMERIC_SCALAR_TYPES) for value in values):
+        try:
+            array = np.array(values)
+            if array.dtype.kind == 'f' and not any(isinstance(value, (float, np.floating)) for value in values):
+                # Only ints, beyond int64: NumPy would round them to float64
+                array = np.array(values, dtype=np.uint64)
+        except (OverflowError, ValueError, TypeError):
+            array = None
+        if array is not None and array.dtype.kind in 'biuf':
+            return array
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+def _byte_column_dtype(dtype: np.dtype) -> np.dtype:
+    """
+    dtype of the column of a typed 'byte' field. struct.unpack yields Python ints/floats,
+    which become int64/float64 columns; uint64 keeps its own type, as its values may exceed
+    int64. The dtype depends on the directive only, so it is the same for every chunk.
+    """
+    if dtype.kind == 'f':
+        return np.dtype(np.float64)
+    if dtype == np.uint64:
+        return dtype
+    return np.dtype(np.int64)
+
+def _unpack_byte_column(payloads: List[Any], start: int, dtype: np.dtype) -> Optional[np.ndarray]:
+    """
+    Unpacks the value at a fixed byte offset from every payload of a chunk at once.
+    Returns None if any payload is not bytes or too short; such chunks are left to the
+    per-message conversion and its warnings.
+    """
+    if not payloads or not all(type(payload) is bytes for payload in payloads):
+        return None
+    stop = start + dtype.itemsize
+    if min(map(len, payloads)) < stop:
+        return None
+
+    # Only the value bytes of each payload are copied, not the whole payloads
+    values = np.frombuffer(b''.join([payload[start:stop] for payload in payloads]), dtype=dtype)
+    return values.astype(_byte_column_dtype(dtype))
+
+def _identity(value: Any) -> Any:
+    """Converter of the 'default' directive."""
+    return value
+
+class TaskProcessor:
+    """Parses the decoded messages of one analysis task into rows for the analysis DataFrame."""
 
     def __init__(self, analysis_task: Dict[str, Any]):
         self.task_id = analysis_task['id']
         self.topic_name = analysis_task['topic_name']
         self.field_names = [name.strip() for name in analysis_task['field_names'].split(',')]
         self.parse_string = analysis_task['parse_string']
+        self.raw_column_names = [f"raw_{field}" for field in self.field_names]
+        # Warnings about skipped messages are counted here rather than printed one by one;
+        # see `count_warning` and `report_warnings`
+        self._warning_counts: Counter = Counter()
 
-        self.aeval = Interpreter()
+        # Field paths are parsed once into accessor functions
+        self._accessors: Dict[str, Callable[[Any], Any]] = {
+            field: _build_accessor(field) for field in self.field_names
+        }
         self.directives = self._extract_directives()
+        # Directives are parsed once here rather than for every message
+        self._compiled_directives: Dict[str, Callable[[Any], Any]] = {
+            field: self._compile_directive(directive) for field, directive in self.directives.items()
+        }
+        # Typed 'byte' directives read a fixed layout, so they are unpacked for a whole chunk
+        # at once in `evaluate`; per message, the payload is passed through unchanged.
+        # Entries are (field index, byte offset, dtype, per-message converter).
+        self._byte_fields: List[Tuple[int, int, np.dtype, Callable[[Any], Any]]] = []
+        for index, field in enumerate(self.field_names):
+            match = _BYTE_DIRECTIVE.fullmatch(self.directives.get(field, ''))
+            if match and match.group(3):
+                self._byte_fields.append((index, int(match.group(1)), np.dtype(_STRUCTS[match.group(3)].format),
+                                          self._compiled_directives[field]))
+        # Numeric 'type' directives are likewise cast for a whole chunk with astype, which
+        # also keeps the wrap-around semantics of the former pandas cast
+        self._typed_fields: List[Tuple[int, np.dtype]] = []
+        for index, field in enumerate(self.field_names):
+            match = _TYPE_DIRECTIVE.fullmatch(self.directives.get(field, ''))
+            if match and np.dtype(match.group(1)).kind in 'biuf':
+                self._typed_fields.append((index, np.dtype(match.group(1))))
+        for index, *_ in self._byte_fields + self._typed_fields:
+            self._compiled_directives[self.field_names[index]] = _identity
+        # Only these fields are converted per message; the parsed column of any other field
+        # is its raw column itself
+        self._converted_fields: List[Tuple[int, Callable[[Any], Any]]] = [
+            (index, self._compiled_directives[field]) for index, field in enumerate(self.field_names)
+            if self._compiled_directives.get(field, _identity) is not _identity
+        ]
+        self._field_accessors = [self._accessors[field] for field in self.field_names]
+        self._fields_without_directive = [field for field in self.field_names if field not in self._compiled_directives]
+        # Rows returned by process_message, overwritten for every message
+        self._raw_row: List[Any] = [None] * len(self.field_names)
+        self._converted_row: List[Any] = [None] * len(self._converted_fields)
+        # Remove the fields' directives from the expression string for evaluation; other
+        # parentheses (calls, grouping) are part of the expression
+        self.expression = self.parse_string
+        if self._directive_pattern is not None:
+            self.expression = self._directive_pattern.sub(r'\1', self.parse_string)
+        # Replace dots in the field names with underscores to get valid Python identifiers,
+        # then compile the expression once for all messages
+        self._safe_field_names = [field.replace('.', '_') for field in self.field_names]
+        self._field_pairs = list(zip(self.field_names, self._safe_field_names))
+        self._safe_expression = self.expression
+        for field, safe_field_name in self._field_pairs:
+            self._safe_expression = self._safe_expression.replace(field, safe_field_name)
+        self._code = _compile_expression(self._safe_expression)
+        # Namespace of the row-wise evaluation, keyed by the safe field names
+        self._locals: Dict[str, Any] = dict.fromkeys(self._safe_field_names)
+        # Chunks are evaluated as whole arrays until an expression turns out not to be element-wise
+        self._vectorize = True
+        # numexpr knows functions (e.g. 'where') that are not available on the other paths, so
+        # it is only used for expressions over the fields alone (arithmetic and comparisons)
+        self._use_numexpr = numexpr is not None and set(self._code.co_names) <= set(self._safe_field_names)
+        # dtype of the parsed values, set by the first chunk and only ever widened (see
+        # _keep_result_dtype), so that a task's column type does not change between chunks
+        self._result_dtype: Optional[np.dtype] = None
 
     def _extract_directives(self) -> Dict[str, str]:
         """
         Extracts the parsing method for each field from the parse_string.
         If a field is not in the 'field(...)' format, it defaults to 'default'.
         """
-        directives = {}
         # Find all potential field names in the expression
-        potential_fields = set(re.findall(r'([a-zA-Z_][\w\.]*)', self.parse_string))
-
-        for field in self.field_names:
-            # Only process fields that are listed in the 'field_names' config
-            if field in potential_fields:
-                match = re.search(re.escape(field) + r'\((.*?)\)', self.parse_string)
-                if match:
-                    directives[field] = match.group(1)
-                else:
-                    # If no directive is specified, use 'default'
-                    directives[field] = 'default'
-        return directives
+        potential_fields = set(_IDENT.findall(self.parse_string))
+        # Only process fields that are listed in the 'field_names' config.
+        # If no directive is specified, use 'default'
+        directives = {field: 'default' for field in self.field_names if field in potential_fields}
+        self._directive_pattern = None
+        if not directives:
+            return directives
 
-    def _get_field_value(self, msg: Any, field_name: str) -> Any:
-        """Retrieves a value from a nested message object using a dot-separated field name."""
-        try:
-            value = msg
-            for attr in field_name.split('.'):
-                if '[' in attr and attr.endswith(']'):
-                    attr_name, index = attr[:-1].split('[')
-                    value = getattr(value, attr_name)[int(index)]
-                else:
-                    value = getattr(value, attr)
-            return value
-        except (AttributeError, IndexError, KeyError) as e:
-            print(f"Warning: Failed to retrieve value for field '{field_name}': {e}", file=sys.stderr)
-            return None
-
-    def _apply_directive(self, raw_value: Any, directive: str) -> Any:
-        """Parses/converts a raw value according to the extracted directive."""
-        if raw_value is None:
-            return None
+        # One pass over the parse_string for all 'field(...)' occurrences. Longer names come
+        # first in the alternation, and a name must not be preceded by an identifier character,
+        # so neither 'a.x(...)' nor a call like 'max(...)' is taken as a directive of a field 'x'.
+        names = sorted(directives, key=len, reverse=True)
+        pattern = re.compile(r'(?<![\w.])(' + '|'.join(map(re.escape, names)) + r')\((.*?)\)')
+        self._directive_pattern = pattern
+        found = set()
+        for match in pattern.finditer(self.parse_string):
+            field = match.group(1)
+            if field not in found:
+                directives[field] = match.group(2)
+                found.add(field)
+        return directives
 
+    def _compile_directive(self, directive: str) -> Callable[[Any], Any]:
+        """
+        Parses a directive once into a function that converts a raw value.
+        The returned function returns None if the message must be skipped.
+        """
         if directive == 'default':
-            return raw_value
+            return _identity
 
-        match = re.fullmatch(r'type:(\w+)', directive)
+        match = _TYPE_DIRECTIVE.fullmatch(directive)
         if match:
-            type_name = match.group(1)
-            return pd.Series([raw_value]).astype(type_name).iloc[0]
+            # The NumPy scalar type (e.g. np.float64) gives the same value as a pandas astype
+            return np.dtype(match.group(1)).type
 
-        match = re.fullmatch(r'byte:(\d+)-(\d+)(?:,type:(\w+))?', directive)
+        match = _BYTE_DIRECTIVE.fullmatch(directive)
         if match:
             start, length, type_name = match.groups()
             start, length = int(start), int(length)
+            stop = start + length
+
+            unpack_from = None
+            if type_name:
+                if type_name not in _STRUCTS:
+                    raise ValueError(f"Unsupported type '{type_name}' specified in 'byte' directive.")
+                if _STRUCTS[type_name].size != length:
+                    raise ValueError(f"Length {length} of 'byte' directive does not match the size of '{type_name}' ({_STRUCTS[type_name].size}).")
+                unpack_from = _STRUCTS[type_name].unpack_from
+
+            def convert_bytes(raw_value: Any) -> Any:
+                if not isinstance(raw_value, (bytes, list, np.ndarray)):
+                    self.count_warning(f"The 'byte' directive can only be applied to bytes or list/array types, but got {type(raw_value)}.")
+                    return None
+
+                buffer = _byte_buffer(raw_value) if unpack_from is not None else None
+                if buffer is not None:
+                    # Unpack straight from the message buffer, without copying the slice
+                    if len(buffer) < stop:
+                        self.count_warning(f"Byte slice is shorter ({max(len(buffer) - start, 0)}) than the requested length ({length}).")
+                        return None
+                    return unpack_from(buffer, start)[0]
+
+                byte_slice = bytes(raw_value[start:stop])
+
+                if len(byte_slice) < length:
+                    self.count_warning(f"Byte slice is shorter ({len(byte_slice)}) than the requested length ({length}).")
+                    return None
+
+                if unpack_from is None:
+                    return byte_slice
+                return unpack_from(byte_slice)[0]
+
+            return convert_bytes
 
-            if not isinstance(raw_value, (bytes, list, np.ndarray)):
-                 print(f"Warning: The 'byte' directive can only be applied to bytes or list/array types, but got {type(raw_value)}.", file=sys.stderr)
-                 return None
+        raise ValueError(f"Unknown parsing directive: '{directive}'")
+
+    def process_message(self, ros_msg: Any) -> Optional[Tuple[List[Any], List[Any]]]:
+        """
+        Parses a single decoded message. Returns the raw field values (in the order of
+        `raw_column_names`) and the values of the fields converted per message (in the
+        order of `_converted_fields`), or None if the message must be skipped.
+        Both lists are reused for the next message. The expression is evaluated per chunk
+        by `evaluate`. Raises `_FieldMissing` if a field cannot be read from the message.
+        """
+        if self._fields_without_directive:
+            self.count_warning(f"Directive for field '{self._fields_without_directive[0]}' not found. Skipping.")
+            return None
 
-            byte_slice = bytes(raw_value[start : start + length])
+        raw_row = self._raw_row
+        # One handler for all fields instead of a check per field
+        index = 0
+        try:
+            for index, accessor in enumerate(self._field_accessors):
+                raw_row[index] = accessor(ros_msg)
+        except (AttributeError, IndexError, KeyError) as e:
+            raise _FieldMissing(self.field_names[index], e) from None
 
-            if len(byte_slice) < length:
-                print(f"Warning: Byte slice is shorter ({len(byte_slice)}) than the requested length ({length}).", file=sys.stderr)
+        converted_row = self._converted_row
+        for j, (index, convert) in enumerate(self._converted_fields):
+            parsed_val = convert(raw_row[index])
+            if parsed_val is None:
                 return None
+            converted_row[j] = parsed_val
 
-            if type_name:
-                format_map = {
-                    'float64': '<d', 'float32': '<f', 'int64': '<q', 'uint64': '<Q',
-                    'int32': '<i', 'uint32': '<I', 'int16': '<h', 'uint16': '<H',
-                    'int8': '<b', 'uint8': '<B',
-                }
-                if type_name not in format_map:
-                    raise ValueError(f"Unsupported type '{type_name}' specified in 'byte' directive.")
-                return struct.unpack(format_map[type_name], byte_slice)[0]
+        return raw_row, converted_row
+
+    def count_warning(self, message: str):
+        """Counts a warning about a skipped message; it is printed by `report_warnings`."""
+        self._warning_counts[message] += 1
+
+    def report_warnings(self, source: Path):
+        """Prints one line per distinct warning counted since the last report, then resets the counts."""
+        for message, count in self._warning_counts.items():
+            print(f"Warning: Task '{self.task_id}' in '{source}': {message} ({count} message(s))", file=sys.stderr)
+        self._warning_counts.clear()
+
+    def evaluate(self, raw_columns: List[List[Any]], converted_columns: List[List[Any]], num_rows: int) -> Tuple[np.ndarray, Optional[List[int]]]:
+        """
+        Evaluates the expression over a chunk, given as one list of raw values per field and
+        one list per converted field (see `process_message`). Returns the parsed values and,
+        if the expression failed for some rows, the indices of the rows that were kept
+        (None if all were).
+        """
+        field_columns = list(raw_columns)
+        for (index, _), column in zip(self._converted_fields, converted_columns):
+            field_columns[index] = column
+
+        kept_rows = None
+        if self._byte_fields:
+            field_columns, kept_rows = self._unpack_byte_fields(field_columns)
+            if kept_rows is not None:
+                num_rows = len(kept_rows)
+        if self._typed_fields:
+            field_columns = self._cast_typed_fields(field_columns)
+
+        if self._vectorize:
+            values = self._evaluate_arrays(field_columns, num_rows)
+            if values is not None:
+                return self._keep_result_dtype(values), kept_rows
+        values, evaluated_rows = self._evaluate_rows(field_columns, num_rows)
+        if evaluated_rows is not None:
+            kept_rows = evaluated_rows if kept_rows is None else [kept_rows[i] for i in evaluated_rows]
+        return self._keep_result_dtype(values), kept_rows
+
+    def _keep_result_dtype(self, values: np.ndarray) -> np.ndarray:
+        """
+        Casts a chunk's parsed values to the task's result dtype. If the chunk needs a wider
+        type (e.g. floats after a first chunk of ints), the task's dtype is widened once to the
+        common type and kept from then on.
+        """
+        if values.size == 0 or values.dtype.kind not in 'biuf':
+            return values
+        if self._result_dtype is None:
+            self._result_dtype = values.dtype
+        elif values.dtype != self._result_dtype:
+            if not np.can_cast(values.dtype, self._result_dtype, casting='safe'):
+                self._result_dtype = np.promote_types(self._result_dtype, values.dtype)
+            values = values.astype(self._result_dtype)
+        return values
+
+    def _cast_typed_fields(self, field_columns: List[Any]) -> List[Any]:
+        """Casts the columns of numeric 'type' fields into arrays of their dtype."""
+        field_columns = list(field_columns)
+        for index, dtype in self._typed_fields:
+            values = np.asarray(field_columns[index])
+            if values.ndim != 1:
+                # e.g. array fields; cast value by value
+                field_columns[index] = [dtype.type(value) for value in field_columns[index]]
+                continue
+            if dtype.kind in 'iu' and values.dtype.kind == 'f' and np.isnan(values).any():
+                raise ValueError(f"Cannot convert NaN to '{dtype}' for field '{self.field_names[index]}'.")
+            field_columns[index] = values.astype(dtype, copy=False)
+        return field_columns
+
+    def _unpack_byte_fields(self, field_columns: List[List[Any]]) -> Tuple[List[Any], Optional[List[int]]]:
+        """
+        Converts the payload columns of typed 'byte' fields into value arrays. Returns the
+        new field columns and, if payloads were rejected, the indices of the rows that were kept.
+        """
+        field_columns = list(field_columns)
+        rejected_rows = set()
+        converted_indices = []
+        for index, start, dtype, convert in self._byte_fields:
+            values = _unpack_byte_column(field_columns[index], start, dtype)
+            if values is None:
+                # Mixed or short payloads: convert message by message, which warns as before
+                values = [convert(payload) for payload in field_columns[index]]
+                rejected_rows.update(i for i, value in enumerate(values) if value is None)
+                converted_indices.append(index)
+            field_columns[index] = values
+
+        kept_rows = None
+        if rejected_rows:
+            kept_rows = [i for i in range(len(field_columns[0])) if i not in rejected_rows]
+            field_columns = [[column[i] for i in kept_rows] for column in field_columns]
+            converted_indices = [index for index, *_ in self._byte_fields]
+        # Values converted message by message get the dtype of a chunk unpacked at once
+        for index, _, dtype, _ in self._byte_fields:
+            if index in converted_indices:
+                field_columns[index] = np.array(field_columns[index], dtype=_byte_column_dtype(dtype))
+        return field_columns, kept_rows
+
+    def _evaluate_arrays(self, field_columns: List[List[Any]], num_rows: int) -> Optional[np.ndarray]:
+        """
+        Evaluates the expression once over whole numeric columns, with numexpr if available.
+        Returns None if the chunk has to be evaluated row by row instead.
+        """
+        arrays = {}
+        for safe_field_name, column in zip(self._safe_field_names, field_columns):
+            array = np.asarray(column)
+            # Boolean columns are left to the row-wise path: for arrays, True + True is True, not 2
+            if array.ndim != 1 or array.dtype.kind not in 'iuf':
+                return None
+            if array.dtype.kind == 'f' and isinstance(column, list) and set(map(type, column)) != {float}:
+                # e.g. Python ints beyond int64, which NumPy silently converts to float64
+                return None
+            arrays[safe_field_name] = array
+
+        values = self._evaluate_vectorized(arrays, num_rows)
+        if values is None:
+            return None
+        if any(array.dtype.kind in 'iu' for array in arrays.values()) and not self._matches_float_evaluation(arrays, values):
+            # Integer arrays wrap around silently where Python ints would not; leave the
+            # chunk to the row-wise evaluation
+            return None
+        return values
+
+    def _evaluate_vectorized(self, arrays: Dict[str, np.ndarray], num_rows: int) -> Optional[np.ndarray]:
+        """Evaluates the expression over the given column arrays with numexpr or NumPy."""
+        if self._use_numexpr and all(array.dtype in _NUMEXPR_DTYPES for array in arrays.values()):
+            try:
+                values = numexpr.evaluate(self._safe_expression, local_dict=arrays, global_dict={})
+            except Exception:
+                # e.g. math.* constants or functions, which numexpr does not know
+                self._use_numexpr = False
             else:
-                return byte_slice
+                # A non-finite result may come from a division by zero, which raises for
+                # Python numbers; leave those chunks to the checks of the NumPy path
+                if values.shape == (num_rows,) and (values.dtype.kind != 'f' or np.isfinite(values).all()):
+                    # Return the dtype the NumPy path would, taken from an evaluation of one row
+                    with np.errstate(all='ignore'):
+                        numpy_dtype = np.asarray(eval(self._code, _SAFE_GLOBALS, {name: array[:1] for name, array in arrays.items()})).dtype
+                    return values.astype(numpy_dtype, copy=False)
 
-        raise ValueError(f"Unknown parsing directive: '{directive}'")
+        try:
+            # Floating point errors raise here, so that the affected chunk falls back to the
+            # row-wise evaluation, which skips the offending rows as before
+            with np.errstate(divide='raise', over='raise', invalid='raise'):
+                values = eval(self._code, _SAFE_GLOBALS, arrays)
+        except FloatingPointError:
+            return None
+        except Exception:
+            values = None
+        if not (isinstance(values, np.ndarray) and values.shape == (num_rows,) and values.dtype.kind in 'biuf'):
+            # Not an element-wise expression over arrays (e.g. math.* calls or conditionals)
+            self._vectorize = False
+            return None
+        return values
 
-    def process_mcap_files(self, mcap_paths: List[Path]) -> pd.DataFrame:
-        """Processes multiple MCAP files and generates a DataFrame for analysis."""
-        all_rows = []
-        # Remove directives from the expression string for evaluation
-        expression = re.sub(r'\([^)]+\)', '', self.parse_string)
+    def _matches_float_evaluation(self, arrays: Dict[str, np.ndarray], values: np.ndarray) -> bool:
+        """
+        Checks a result computed from integer columns against the same expression evaluated
+        in float64, which cannot wrap around. A mismatch means an integer overflow somewhere
+        in the expression (or a result beyond float64 precision, which is checked row-wise too).
+        """
+        float_arrays = {name: array.astype(np.float64) for name, array in arrays.items()}
+        try:
+            with np.errstate(all='ignore'):
+                expected = eval(self._code, _SAFE_GLOBALS, float_arrays)
+        except Exception:
+            # e.g. bitwise operators, which float64 does not support; the result cannot be checked
+            self._vectorize = False
+            return False
+        if values.dtype.kind == 'b':
+            return bool(np.array_equal(values, expected))
+        return bool(np.allclose(values, expected, rtol=1e-9, atol=0.0, equal_nan=True))
 
-        for mcap_path in tqdm(natsorted(mcap_paths)):
+    def _evaluate_rows(self, field_columns: List[List[Any]], num_rows: int) -> Tuple[np.ndarray, Optional[List[int]]]:
+        """Evaluates the expression for each row of the chunk, skipping rows for which it fails."""
+        # Unpacked byte fields are arrays; evaluate on the Python numbers struct would give.
+        # Cast 'type' fields are evaluated on NumPy scalars, as by the former per-message cast.
+        field_columns = list(field_columns)
+        for index, *_ in self._byte_fields:
+            if isinstance(field_columns[index], np.ndarray):
+                field_columns[index] = field_columns[index].tolist()
+        values = []
+        kept_rows = []
+        # The namespace is reused for all rows; every row overwrites the same (field) keys
+        local_values = self._locals
+        names = self._safe_field_names
+        for i, row in enumerate(zip(*field_columns)):
+            local_values.update(zip(names, row))
             try:
-                with open(mcap_path, "rb") as f:
-                    reader = make_reader(f, decoder_factories=[DecoderFactory()])
-                    for schema, channel, message, ros_msg in reader.iter_decoded_messages(topics=[self.topic_name]):
-                        # ros_msg = reader.deserialize(schema, message)
-
-                        raw_values = {}
-                        parsed_values_for_eval = {}
-                        should_skip = False
-
-                        for field in self.field_names:
-                            raw_val = self._get_field_value(ros_msg, field)
-                            raw_values[f"raw_{field}"] = raw_val
-
-                            if raw_val is None:
-                                should_skip = True
-                                break
-
-                            directive = self.directives.get(field)
-                            if directive is None:
-                                print(f"Warning: Directive for field '{field}' not found. Skipping.", file=sys.stderr)
-                                should_skip = True
-                                break
-
-                            parsed_val = self._apply_directive(raw_val, directive)
-                            if parsed_val is None:
-                                should_skip = True
-                                break
-
-                            # Replace dots with underscores for use in the asteval symbol table
-                            safe_field_name = field.replace('.', '_')
-                            parsed_values_for_eval[safe_field_name] = parsed_val
-
-                        if should_skip:
-                            continue
+                values.append(eval(self._code, _SAFE_GLOBALS, local_values))
+            except Exception as e:
+                self.count_warning(f"Failed to evaluate expression '{self._safe_expression}': {e}")
+                continue
+            kept_rows.append(i)
+        return _values_to_array(values), (kept_rows if len(kept_rows) < num_rows else None)
+
+
+class _ChunkBuffer:
+    """
+    Accumulates one task's rows until a chunk is complete. Log times are written into a
+    preallocated NumPy array sized to the chunk; raw field values and the values of fields
+    converted per message are kept column-wise in one list each, and the expression is
+    evaluated on flush.
+    """
 
-                        # Replace field names in the expression as well
-                        safe_expression = expression
-                        for field in self.field_names:
-                           safe_expression = safe_expression.replace(field, field.replace('.', '_'))
+    def __init__(self, capacity: int, processor: TaskProcessor):
+        self.capacity = capacity
+        self.processor = processor
+        self.clear()
+
+    def clear(self):
+        """Discards the buffered rows and starts a new chunk."""
+        self.size = 0
+        self.raw_columns: List[List[Any]] = [[] for _ in self.processor.field_names]
+        self.converted_columns: List[List[Any]] = [[] for _ in self.processor._converted_fields]
+        self.timestamps = np.empty(self.capacity, dtype=np.int64)
+
+    def append(self, log_time: int, raw_values: List[Any], converted_values: List[Any]):
+        """Adds a row to the chunk."""
+        self.timestamps[self.size] = log_time
+        for column, raw_value in zip(self.raw_columns, raw_values):
+            column.append(raw_value)
+        for column, converted_value in zip(self.converted_columns, converted_values):
+            column.append(converted_value)
+        self.size += 1
+
+    def flush(self) -> Optional[pa.RecordBatch]:
+        """
+        Evaluates the expression over the buffered rows and returns them as an Arrow
+        RecordBatch (None if no row is left), then starts a new chunk.
+        """
+        parsed_values, kept_rows = self.processor.evaluate(self.raw_columns, self.converted_columns, self.size)
+        timestamps = self.timestamps[:self.size]
+        raw_columns = self.raw_columns
+        if kept_rows is not None:
+            timestamps = timestamps[kept_rows]
+            raw_columns = [[column[i] for i in kept_rows] for column in raw_columns]
+
+        columns = {"mcap_timestamp_ns": timestamps}
+        columns.update(zip(self.processor.raw_column_names, raw_columns))
+        columns["parsed_value"] = parsed_values
+        # The numeric arrays are shared with the batch; fresh ones are allocated for the next chunk
+        self.clear()
+        if len(parsed_values) == 0:
+            return None
+        return pa.RecordBatch.from_pydict(columns)
 
-                        self.aeval.symtable = parsed_values_for_eval
-                        final_value = self.aeval.eval(safe_expression)
 
-                        row = {"mcap_timestamp_ns": message.log_time}
-                        row.update(raw_values)
-                        row["parsed_value"] = final_value
-                        all_rows.append(row)
+class McapReader:
+    """
+    Reads MCAP files once for all analysis tasks, dispatching each message to the
+    tasks subscribed to its topic.
+    """
 
+    def __init__(self, analyses: List[Dict[str, Any]], buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.analyses: List[Dict[str, Any]] = []
+        self.processors: List[TaskProcessor] = []
+        self._topic_to_processors: Dict[str, List[TaskProcessor]] = defaultdict(list)
+
+        for task in analyses:
+            try:
+                processor = TaskProcessor(task)
             except Exception as e:
-                print(f"Error: An error occurred while processing MCAP file '{mcap_path}': {e}", file=sys.stderr)
+                print(f"Error: Invalid configuration for task '{task.get('id', 'N/A')}': {e}", file=sys.stderr)
                 continue
+            self.analyses.append(task)
+            self.processors.append(processor)
+            self._topic_to_processors[processor.topic_name].append(processor)
+
+    def iter_chunks(self, mcap_paths: List[Path], chunk_size: int = CHUNK_SIZE, max_workers: Optional[int] = None) -> Iterator[Tuple[str, pa.RecordBatch]]:
+        """
+        Processes multiple MCAP files, reading each file exactly once, and yields
+        `(task_id, RecordBatch)` pairs with at most `chunk_size` rows per batch.
+
+        Files are decoded in parallel by up to `max_workers` processes (default: one per CPU),
+        but their chunks are always yielded in file order, so consumers see each task's
+        messages in the same order as in a sequential run.
+        """
+        if not self._topic_to_processors:
+            return
+
+        mcap_paths = natsorted(mcap_paths)
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = min(max_workers, len(mcap_paths))
+
+        # The bar counts files; the rows parsed so far are shown alongside, updated per chunk
+        num_rows = 0
+        if max_workers <= 1:
+            # While a file is being decoded, a thread pulls the next one into the page cache
+            with ThreadPoolExecutor(max_workers=1) as prefetcher, \
+                    tqdm(total=len(mcap_paths), mininterval=0.5, smoothing=0.1) as progress:
+                for i, mcap_path in enumerate(mcap_paths):
+                    if i + 1 < len(mcap_paths):
+                        prefetcher.submit(_prefetch_file, mcap_paths[i + 1])
+                    for task_id, batch in self._iter_file_chunks(mcap_path, chunk_size):
+                        num_rows += batch.num_rows
+                        progress.set_postfix(rows=num_rows, refresh=False)
+                        yield task_id, batch
+                    progress.update()
+            return
+
+        read_file = functools.partial(_read_file_chunks, self.analyses, self.buffer_size, chunk_size=chunk_size)
+        # 'spawn' rather than 'fork': forking after the analyzers' Numba thread pool has
+        # started can deadlock the workers.
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor, \
+                tqdm(total=len(mcap_paths), mininterval=0.5, smoothing=0.1) as progress:
+            # At most max_workers files are in flight, so that the parsed chunks of files that
+            # are not consumed yet never pile up; the next file is submitted as one is consumed
+            pending: Deque[Tuple[Path, Future]] = deque()
+            remaining_paths = iter(mcap_paths)
+
+            def submit_next():
+                mcap_path = next(remaining_paths, None)
+                if mcap_path is None:
+                    return
+                try:
+                    future = executor.submit(read_file, mcap_path)
+                except Exception as e:
+                    # e.g. BrokenProcessPool after a worker was killed; reported in file order below
+                    future = Future()
+                    future.set_exception(e)
+                # The progress bar counts files as they complete, in any order,
+                # while their chunks are still yielded in file order below
+                future.add_done_callback(lambda _: progress.update())
+                pending.append((mcap_path, future))
+
+            for _ in range(max_workers):
+                submit_next()
+            while pending:
+                mcap_path, future = pending.popleft()
+                try:
+                    chunks = future.result()
+                except Exception as e:
+                    print(f"Error: An error occurred while processing MCAP file '{mcap_path}': {e}", file=sys.stderr)
+                    chunks = []
+                submit_next()
+                for task_id, batch in chunks:
+                    num_rows += batch.num_rows
+                    progress.set_postfix(rows=num_rows, refresh=False)
+                    yield task_id, batch
+                del chunks
+
+    def _iter_file_chunks(self, mcap_path: Path, chunk_size: int) -> Iterator[Tuple[str, pa.RecordBatch]]:
+        """Processes a single MCAP file and yields its `(task_id, RecordBatch)` chunks."""
+        buffers = {p.task_id: _ChunkBuffer(chunk_size, p) for p in self.processors}
+        # Dispatch table of (task_id, bound process_message, chunk buffer) handlers, built once per file
+        topic_handlers = {
+            topic: [(p.task_id, p.process_message, buffers[p.task_id]) for p in procs]
+            for topic, procs in self._topic_to_processors.items()
+        }
+        # Each channel's topic is resolved once; later messages are dispatched by channel id
+        channel_handlers: Dict[int, List[Tuple[str, Callable, _ChunkBuffer]]] = {}
+        try:
+            with _open_for_single_read(mcap_path, self.buffer_size) as f:
+                reader = make_reader(f, decoder_factories=[DecoderFactory()])
+                for schema, channel, message, ros_msg in reader.iter_decoded_messages(topics=list(topic_handlers)):
+                    handlers = channel_handlers.get(channel.id)
+                    if handlers is None:
+                        handlers = channel_handlers[channel.id] = topic_handlers.get(channel.topic, [])
+
+                    for handler in handlers:
+                        task_id, process_message, buffer = handler
+                        try:
+                            result = process_message(ros_msg)
+                        except _FieldMissing as e:
+                            buffer.processor.count_warning(str(e))
+                            continue
+                        except Exception as e:
+                            print(f"Error: An error occurred while processing MCAP file '{mcap_path}' for task '{task_id}': {e}", file=sys.stderr)
+                            # Skip the task for the rest of the file, including channels not seen yet
+                            for channel_id, others in channel_handlers.items():
+                                channel_handlers[channel_id] = [h for h in others if h is not handler]
+                            for topic, others in topic_handlers.items():
+                                topic_handlers[topic] = [h for h in others if h is not handler]
+                            continue
+                        if result is None:
+                            continue
+
+                        buffer.append(message.log_time, *result)
+                        if buffer.size >= chunk_size:
+                            batch = self._flush_buffer(task_id, buffer)
+                            if batch is not None:
+                                yield task_id, batch
+
+        except Exception as e:
+            print(f"Error: An error occurred while processing MCAP file '{mcap_path}': {e}", file=sys.stderr)
+
+        for task_id, buffer in buffers.items():
+            if buffer.size:
+                batch = self._flush_buffer(task_id, buffer)
+                if batch is not None:
+                    yield task_id, batch
+
+        for processor in self.processors:
+            processor.report_warnings(mcap_path)
+
+    def _flush_buffer(self, task_id: str, buffer: _ChunkBuffer) -> Optional[pa.RecordBatch]:
+        """Flushes a chunk buffer; a chunk that cannot be converted is dropped with an error."""
+        try:
+            return buffer.flush()
+        except Exception as e:
+            print(f"Error: Failed to convert a chunk of task '{task_id}': {e}", file=sys.stderr)
+            buffer.clear()
+            return None
+
+
+@contextlib.contextmanager
+def _open_for_single_read(path: Path, buffer_size: int) -> Iterator[Any]:
+    """Opens a file that is read once from start to end, with page cache hints where supported."""
+    with open(path, "rb", buffering=buffer_size) as f:
+        fadvise = hasattr(os, 'posix_fadvise')
+        if fadvise:
+            # Hint the kernel to read ahead aggressively
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        try:
+            yield f
+        finally:
+            if fadvise:
+                # The file is not read again; drop its pages instead of evicting more useful ones
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def _prefetch_file(path: Path):
+    """Pulls a file into the page cache ahead of its decoding; failures are left to the actual read."""
+    try:
+        with open(path, "rb", buffering=0) as f:
+            if hasattr(os, 'posix_fadvise'):
+                # Asynchronous read-ahead of the whole file by the kernel
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                return
+            block = bytearray(PREFETCH_BLOCK_SIZE)
+            while f.readinto(block):
+                pass
+    except OSError:
+        pass
+
 
-        return pd.DataFrame(all_rows)
+def _read_file_chunks(analyses: List[Dict[str, Any]], buffer_size: int, mcap_path: Path, chunk_size: int) -> List[Tuple[str, pa.RecordBatch]]:
+    """Worker entry point for McapReader.iter_chunks: decodes one MCAP file in a separate process."""
+    reader = McapReader(analyses, buffer_size)
+    return list(reader._iter_file_chunks(mcap_path, chunk_size))
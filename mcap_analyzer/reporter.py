@@ -1,22 +1,146 @@
 from pathlib import Path
-import pandas as pd
+import os
+import tempfile
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Set, Tuple
+from mcap_analyzer.utils import INTERMEDIATE_FORMATS
+
+# CSV options of Arrow's writer matching DataFrame.to_csv: unquoted header, and (for the
+# numeric columns it is used for) no quotes at all
+_CSV_WRITE_OPTIONS = pacsv.WriteOptions(quoting_header='none', quoting_style='none')
+
+def _is_csv_numeric(data_type: pa.DataType) -> bool:
+    """Whether a column is written with Arrow's CSV writer (integer and floating point columns)."""
+    return pa.types.is_integer(data_type) or pa.types.is_floating(data_type)
+
+def _format_csv_columns(table: pa.Table) -> pa.Table:
+    """
+    Formats numeric columns as text the way DataFrame.to_csv does where it matters for reading
+    the file back: integral floats keep a '.0' (10.0, not 10), so that the column is still read
+    as float64, and NaN is written as an empty field. All columns become strings, so chunks of
+    a task share the writer's schema even if a column's type changes between them (e.g. int64
+    in one chunk and double in the next, which reads back as float64 as with pandas).
+    """
+    for i, field in enumerate(table.schema):
+        column = table.column(i)
+        text = pc.cast(column, pa.string())
+        if pa.types.is_floating(field.type):
+            text = pc.if_else(pc.match_substring_regex(text, r'^-?\d+$'),
+                              pc.binary_join_element_wise(text, '.0', ''), text)
+            text = pc.if_else(pc.is_nan(column), pa.scalar(None, pa.string()), text)
+        table = table.set_column(i, field.name, text)
+    return table
 
 class Reporter:
     """Manages the generation of analysis result reports."""
 
-    def __init__(self, output_dir: Path):
+    def __init__(self, output_dir: Path, intermediate_format: str = 'parquet'):
+        if intermediate_format not in INTERMEDIATE_FORMATS:
+            raise ValueError(f"Unsupported intermediate format '{intermediate_format}'. Choose from {INTERMEDIATE_FORMATS}.")
         self.output_dir = output_dir
+        self.intermediate_format = intermediate_format
         self.results: Dict[str, Dict[str, Any]] = {}
         self.start_time = datetime.datetime.now()
+        self._csv_task_ids: Set[str] = set()
+        self._csv_writers: Dict[str, pacsv.CSVWriter] = {}
+        # Parquet writers with the path they write to, which is a temporary file once the
+        # schema had to be widened (see _widen_parquet_schema)
+        self._parquet_writers: Dict[str, Tuple[pq.ParquetWriter, Path]] = {}
 
-    def save_intermediate_csv(self, task_id: str, df: pd.DataFrame):
-        """Saves the intermediate DataFrame as a CSV file."""
+    def save_intermediate(self, task_id: str, batch: pa.RecordBatch):
+        """
+        Saves the intermediate RecordBatch in the configured format ('none' skips it).
+        Subsequent calls for the same task append the batch as a further chunk.
+        """
+        if self.intermediate_format == 'csv':
+            self._save_intermediate_csv(task_id, batch)
+        elif self.intermediate_format == 'parquet':
+            self._save_intermediate_parquet(task_id, batch)
+
+    def _save_intermediate_csv(self, task_id: str, batch: pa.RecordBatch):
+        """
+        Saves (or appends) the intermediate RecordBatch as a CSV file. Tasks with only numeric
+        columns are written by Arrow's CSV writer in the format of DataFrame.to_csv; tasks with
+        other columns (e.g. raw bytes or strings) are written through pandas, for the whole file.
+        """
+        numeric = all(_is_csv_numeric(field.type) for field in batch.schema)
+        if task_id in self._csv_writers:
+            if numeric:
+                self._csv_writers[task_id].write_table(_format_csv_columns(pa.Table.from_batches([batch])))
+                return
+            # A column is no longer numeric; the rest of the file is appended through pandas
+            self._csv_writers.pop(task_id).close()
         csv_path = self.output_dir / f"{task_id}.csv"
-        df.to_csv(csv_path, index=False)
+        if task_id in self._csv_task_ids:
+            batch.to_pandas().to_csv(csv_path, mode='a', header=False, index=False)
+            return
+        if numeric:
+            table = _format_csv_columns(pa.Table.from_batches([batch]))
+            writer = pacsv.CSVWriter(csv_path, table.schema, write_options=_CSV_WRITE_OPTIONS)
+            writer.write_table(table)
+            self._csv_writers[task_id] = writer
+        else:
+            batch.to_pandas().to_csv(csv_path, index=False)
+        self._csv_task_ids.add(task_id)
         print(f"Saved intermediate CSV to: {csv_path}")
 
+    def _save_intermediate_parquet(self, task_id: str, batch: pa.RecordBatch):
+        """Saves (or appends) the intermediate RecordBatch as a row group of a Parquet file."""
+        if task_id in self._parquet_writers:
+            writer, _ = self._parquet_writers[task_id]
+            if batch.schema.equals(writer.schema):
+                writer.write_batch(batch)
+                return
+            # e.g. a column that was int64 in the earlier chunks but is double in this one:
+            # the column is widened to a common type rather than cast back to the narrower one
+            schema = pa.unify_schemas([writer.schema, batch.schema], promote_options='permissive')
+            if not schema.equals(writer.schema):
+                writer = self._widen_parquet_schema(task_id, schema)
+            writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+            return
+        parquet_path = self.output_dir / f"{task_id}.parquet"
+        writer = pq.ParquetWriter(parquet_path, batch.schema, compression='zstd')
+        writer.write_batch(batch)
+        self._parquet_writers[task_id] = (writer, parquet_path)
+        print(f"Saved intermediate Parquet to: {parquet_path}")
+
+    def _widen_parquet_schema(self, task_id: str, schema: pa.Schema) -> pq.ParquetWriter:
+        """
+        Copies the row groups written so far into a new file with the given (wider) schema and
+        returns its writer. The new file replaces the task's Parquet file when it is closed.
+        """
+        writer, path = self._parquet_writers.pop(task_id)
+        writer.close()
+        fd, new_path = tempfile.mkstemp(prefix=f".{task_id}.", suffix=".parquet", dir=self.output_dir)
+        os.close(fd)
+        new_path = Path(new_path)
+        new_writer = pq.ParquetWriter(new_path, schema, compression='zstd')
+        self._parquet_writers[task_id] = (new_writer, new_path)
+        written = pq.ParquetFile(path)
+        try:
+            for row_group in range(written.num_row_groups):
+                new_writer.write_table(written.read_row_group(row_group).cast(schema))
+        finally:
+            written.close()
+        if path != self.output_dir / f"{task_id}.parquet":
+            path.unlink()
+        return new_writer
+
+    def close_intermediates(self):
+        """Finishes all intermediate files that are still open for appending."""
+        for task_id, (writer, path) in self._parquet_writers.items():
+            writer.close()
+            if path.name != f"{task_id}.parquet":
+                os.replace(path, self.output_dir / f"{task_id}.parquet")
+        self._parquet_writers.clear()
+        for writer in self._csv_writers.values():
+            writer.close()
+        self._csv_writers.clear()
+
     def add_analysis_result(self, task_id: str, topic_name: str, analysis_type: str, result: dict):
         """Stores the result of an analysis task."""
         self.results[task_id] = {
@@ -43,28 +167,31 @@ class Reporter:
     def write_markdown_report(self):
         """Writes the final analysis results to a Markdown file."""
         md_path = self.output_dir / "result.md"
+        # The report is assembled in memory and written with a single call
+        parts = [f"# MCAP Analysis Report (Generated on: {self.start_time.strftime('%Y-%m-%d %H:%M:%S')})\n\n"]
+
+        for task_id, data in self.results.items():
+            parts.append(f"## Task: {task_id} (Topic: {data['topic_name']})\n\n")
+            result = data['result']
+            analysis_type = data['analysis_type']
+
+            if analysis_type == 'none':
+                parts.append("(No analysis performed for type 'none'.)\n\n")
+            elif not result:
+                parts.append("No analysis results available.\n\n")
+            elif analysis_type.startswith('timestamp'):
+                parts.append(f"Specified Frequency: {result.get('specified_frequency_hz', 'N/A')} Hz "
+                             f"(Expected Period: {result.get('expected_period_s', 'N/A'):.4g} s)\n\n")
+                parts.append(self._format_stats_table("Period", result.get('period_s', {}), "s"))
+                parts.append(self._format_stats_table("Frequency", result.get('frequency_hz', {}), "Hz"))
+                parts.append(self._format_stats_table("Jitter/Drift from ToS", result.get('jitter_drift_s', {}), "s"))
+            elif analysis_type == 'basic_stats':
+                parts.append(self._format_stats_table("Basic Statistics", result.get('basic_stats', {}), "unit-less"))
+
+            parts.append("---\n\n")
+
         with open(md_path, 'w', encoding='utf-8') as f:
-            f.write(f"# MCAP Analysis Report (Generated on: {self.start_time.strftime('%Y-%m-%d %H:%M:%S')})\n\n")
-
-            for task_id, data in self.results.items():
-                f.write(f"## Task: {task_id} (Topic: {data['topic_name']})\n\n")
-                result = data['result']
-                analysis_type = data['analysis_type']
-
-                if analysis_type == 'none':
-                    f.write("(No analysis performed for type 'none'.)\n\n")
-                elif not result:
-                    f.write("No analysis results available.\n\n")
-                elif analysis_type.startswith('timestamp'):
-                    f.write(f"Specified Frequency: {result.get('specified_frequency_hz', 'N/A')} Hz "
-                            f"(Expected Period: {result.get('expected_period_s', 'N/A'):.4g} s)\n\n")
-                    f.write(self._format_stats_table("Period", result.get('period_s', {}), "s"))
-                    f.write(self._format_stats_table("Frequency", result.get('frequency_hz', {}), "Hz"))
-                    f.write(self._format_stats_table("Jitter/Drift from ToS", result.get('jitter_drift_s', {}), "s"))
-                elif analysis_type == 'basic_stats':
-                     f.write(self._format_stats_table("Basic Statistics", result.get('basic_stats', {}), "unit-less"))
-
-                f.write("---\n\n")
+            f.write(''.join(parts))
 
         print(f"Markdown report saved to: {md_path}")
 
@@ -1,6 +1,9 @@
 import datetime
 from pathlib import Path
 
+# Supported formats for the per-task intermediate files
+INTERMEDIATE_FORMATS = ('none', 'csv', 'parquet')
+
 def create_output_directory(base_path: Path = Path("./results")) -> Path:
     """
     Creates a unique output directory including the execution timestamp.
@@ -0,0 +1,190 @@
+"""
+Checks that every evaluation path of TaskProcessor gives the same parsed values as the
+row-wise eval of the expression on the same chunk.
+
+Run from the repository root with: python -m unittest discover -s tests
+"""
+import struct
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from mcap_analyzer import mcap_parser
+from mcap_analyzer.mcap_parser import TaskProcessor
+
+
+def _make_processor(field_names, parse_string):
+    return TaskProcessor({
+        'id': 'test', 'topic_name': '/test',
+        'field_names': field_names, 'parse_string': parse_string,
+    })
+
+
+def _evaluate(field_names, parse_string, raw_columns, mode):
+    """Evaluates one chunk with the given path: 'rows', 'numpy' or 'numexpr'."""
+    processor = _make_processor(field_names, parse_string)
+    if mode == 'rows':
+        processor._vectorize = False
+    elif mode == 'numpy':
+        processor._use_numexpr = False
+    converted_columns = [[convert(value) for value in raw_columns[index]]
+                         for index, convert in processor._converted_fields]
+    values, kept_rows = processor.evaluate(raw_columns, converted_columns, len(raw_columns[0]))
+    return values, kept_rows
+
+
+class ExpressionPathsTest(unittest.TestCase):
+    """The NumPy and numexpr paths against the row-wise path."""
+
+    def assert_paths_match(self, field_names, parse_string, raw_columns):
+        expected, expected_rows = _evaluate(field_names, parse_string, raw_columns, 'rows')
+        modes = ['numpy'] + (['numexpr'] if mcap_parser.numexpr is not None else [])
+        for mode in modes:
+            with self.subTest(mode=mode):
+                values, kept_rows = _evaluate(field_names, parse_string, raw_columns, mode)
+                self.assertEqual(kept_rows, expected_rows)
+                self.assertEqual(values.dtype, expected.dtype)
+                if expected.dtype.kind == 'f':
+                    np.testing.assert_allclose(values, expected, rtol=1e-12)
+                else:
+                    self.assertEqual(values.tolist(), expected.tolist())
+
+    def test_float_arithmetic(self):
+        self.assert_paths_match('twist.linear.x', 'twist.linear.x(type:float64) * 3.6',
+                                [[10.5, 0.0, -3.25, 1e300]])
+
+    def test_typed_timestamp(self):
+        self.assert_paths_match('sec, nanosec', 'sec(type:uint64) * 1000000000 + nanosec(type:uint64)',
+                                [[1_700_000_000, 0, 1], [999_999_999, 0, 5]])
+
+    def test_int_overflow(self):
+        self.assert_paths_match('a', 'a * a', [[2**40, 3, -2**33]])
+
+    def test_int_overflow_in_intermediate(self):
+        self.assert_paths_match('a', 'a * a // 3', [[2**40, 3, 7]])
+
+    def test_bool_arithmetic(self):
+        self.assert_paths_match('a, b', 'a + b', [[True, False, True], [True, True, False]])
+
+    def test_division_by_zero_skips_rows(self):
+        self.assert_paths_match('a, b', 'a / b', [[1.0, 2.0, 3.0], [2.0, 0.0, 4.0]])
+
+    def test_int_division_by_zero_skips_rows(self):
+        self.assert_paths_match('a, b', 'a // b', [[7, 8, 9], [2, 0, 4]])
+
+    def test_comparison(self):
+        self.assert_paths_match('a', 'a * a > 0', [[2**32, 1, 0]])
+
+    def test_names_unknown_to_the_whitelist(self):
+        # numexpr knows 'where', but the expression must fail the same way on every path
+        self.assert_paths_match('a, b', 'where(a > 0, a, 0) / b', [[1.0, -2.0, 3.0], [2.0, 1.0, 4.0]])
+        self.assert_paths_match('a, b', 'where(a > 0, a, 0) / b', [[1.0, -2.0, 3.0], [2.0, 0.0, 4.0]])
+
+    def test_float32_fields(self):
+        self.assert_paths_match('a, b', 'a(type:float32) + b(type:float32)', [[1.1, 2.1], [0.0, 0.0]])
+        self.assert_paths_match('a', 'a(type:float32) * 2', [[1.1, 2.1]])
+        self.assert_paths_match('a', 'a(type:float32) + 0.5', [[1.1, 2.1]])
+
+    def test_int32_fields(self):
+        self.assert_paths_match('a', 'a(type:int32) * 2 + 1', [[1, -7, 2**30]])
+
+    def test_modulo_of_negative_numbers(self):
+        self.assert_paths_match('a, b', 'a % b', [[-7.5, 7.5, -7.0], [2.0, -2.0, 3.0]])
+        self.assert_paths_match('a', 'a % 3', [[-7, 7, -1]])
+
+    def test_math_functions(self):
+        self.assert_paths_match('a', 'sqrt(a) + floor(a)', [[1.0, 2.25, 9.0]])
+
+    def test_calls_and_grouping(self):
+        self.assert_paths_match('twist.linear.x, y', 'abs(twist.linear.x(type:float64) - y) * 2 + max(y, 0)',
+                                [[1.5, -2.0, 3.0], [4.0, 1.0, -1.0]])
+
+
+class ResultDtypeTest(unittest.TestCase):
+    """A task's parsed values keep one dtype across chunks, widened at most when needed."""
+
+    def evaluate_chunks(self, field_names, parse_string, chunks):
+        processor = _make_processor(field_names, parse_string)
+        return [processor.evaluate(raw_columns, [], len(raw_columns[0]))[0] for raw_columns in chunks]
+
+    def test_ints_after_floats_stay_float(self):
+        chunks = [[[1.5, -2.0]], [[-1.0, -3.0]], [[0.5]]]
+        dtypes = [values.dtype for values in self.evaluate_chunks('x', 'max(x, 0)', chunks)]
+        self.assertEqual(dtypes, [np.float64] * 3)
+
+    def test_floats_after_ints_widen_once(self):
+        chunks = [[[-1.0, -3.0]], [[1.5, 2.5, -1.0]], [[-2.0]]]
+        results = self.evaluate_chunks('x', 'max(x, 0)', chunks)
+        self.assertEqual([values.dtype for values in results], [np.int64, np.float64, np.float64])
+        self.assertEqual(results[1].tolist(), [1.5, 2.5, 0.0])
+
+    def test_mixed_ints_and_floats_in_a_chunk(self):
+        values, = self.evaluate_chunks('x', 'x if x > 0 else 0', [[[1.5, -1.0]]])
+        self.assertEqual(values.dtype, np.float64)
+        self.assertEqual(values.tolist(), [1.5, 0.0])
+
+
+class DirectiveStripTest(unittest.TestCase):
+    """Only the 'field(directive)' occurrences of configured fields are removed from parse_string."""
+
+    def assert_expression(self, field_names, parse_string, expression):
+        self.assertEqual(_make_processor(field_names, parse_string).expression, expression)
+
+    def test_directives_are_removed(self):
+        self.assert_expression('sec, nanosec', 'sec(type:uint64) * 1000000000 + nanosec(type:uint64)',
+                               'sec * 1000000000 + nanosec')
+
+    def test_calls_are_kept(self):
+        self.assert_expression('twist.linear.x', 'abs(twist.linear.x) * 2', 'abs(twist.linear.x) * 2')
+        self.assert_expression('x', 'math.sqrt(x(type:float64)) + max(x, 1)', 'math.sqrt(x) + max(x, 1)')
+
+    def test_grouping_is_kept(self):
+        self.assert_expression('a, b', '(a(type:int64) - b) * 2', '(a - b) * 2')
+
+
+class ByteUnpackPathsTest(unittest.TestCase):
+    """The whole-chunk unpack of typed 'byte' fields against the per-message struct.unpack."""
+
+    def assert_paths_match(self, parse_string, payloads):
+        expected, expected_rows = _evaluate('data', parse_string, [payloads], 'rows')
+        with mock.patch.object(mcap_parser, '_unpack_byte_column', return_value=None):
+            per_message, per_message_rows = _evaluate('data', parse_string, [payloads], 'numpy')
+        values, kept_rows = _evaluate('data', parse_string, [payloads], 'numpy')
+        for result, rows in ((per_message, per_message_rows), (values, kept_rows)):
+            self.assertEqual(rows, expected_rows)
+            self.assertEqual(result.tolist(), expected.tolist())
+        self.assertEqual(per_message.dtype, values.dtype)
+        return values
+
+    def test_float64(self):
+        payloads = [b'\x00' * 8 + struct.pack('<d', value) + b'\xff' for value in (1.5, -2.25, 123.456)]
+        self.assert_paths_match('data(byte:8-8,type:float64) * 2', payloads)
+
+    def test_uint64_beyond_int64(self):
+        payloads = [struct.pack('<Q', value) for value in (1, 2**63 + 5, 2**64 - 1)]
+        self.assert_paths_match('data(byte:0-8,type:uint64)', payloads)
+
+    def test_uint64_within_int64(self):
+        # The dtype follows the directive, not the values of the chunk
+        payloads = [struct.pack('<Q', value) for value in (0, 1, 2**40)]
+        self.assertEqual(self.assert_paths_match('data(byte:0-8,type:uint64)', payloads).dtype, np.uint64)
+
+    def test_uint64_dtype_across_chunks(self):
+        processor = _make_processor('data', 'data(byte:0-8,type:uint64)')
+        chunks = [[struct.pack('<Q', value) for value in values] for values in ((1, 2), (2**64 - 1,), (3,))]
+        results = [processor.evaluate([payloads], [], len(payloads))[0] for payloads in chunks]
+        self.assertEqual([values.dtype for values in results], [np.uint64] * 3)
+        self.assertEqual([values.tolist() for values in results], [[1, 2], [2**64 - 1], [3]])
+
+    def test_int16(self):
+        payloads = [b'\x01' + struct.pack('<h', value) for value in (-32768, 0, 32767)]
+        self.assert_paths_match('data(byte:1-2,type:int16) + 1', payloads)
+
+    def test_short_payload_is_skipped(self):
+        payloads = [struct.pack('<i', 7), b'\x00', struct.pack('<i', -7)]
+        self.assert_paths_match('data(byte:0-4,type:int32)', payloads)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Checks the message dispatch of McapReader on small generated recordings.
+
+Run from the repository root with: python -m unittest discover -s tests
+"""
+import contextlib
+import io
+import re
+import tempfile
+import unittest
+from pathlib import Path
+
+from mcap_ros2.writer import Writer
+
+from mcap_analyzer.mcap_parser import McapReader
+
+
+class FailingTaskTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.mcap_path = Path(self._tmp.name) / "two_channels.mcap"
+        # One topic recorded on two channels, the second one first seen halfway through
+        with open(self.mcap_path, "wb") as f:
+            writer = Writer(f)
+            first = writer.register_msgdef("pkg/A", "int32 a\n")
+            second = writer.register_msgdef("pkg/B", "int32 a\n")
+            for i in range(10):
+                if i == 5:
+                    writer._channel_ids.clear()
+                writer.write_message("/t", first if i < 5 else second, {"a": i}, log_time=i, publish_time=i)
+            writer.finish()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_failed_task_is_skipped_on_later_channels(self):
+        reader = McapReader([
+            {'id': 'failing', 'topic_name': '/t', 'field_names': 'a', 'parse_string': 'a'},
+            {'id': 'ok', 'topic_name': '/t', 'field_names': 'a', 'parse_string': 'a'},
+        ])
+        calls = []
+
+        def fail(ros_msg):
+            calls.append(ros_msg)
+            raise RuntimeError("failure")
+        reader.processors[0].process_message = fail
+
+        chunks = list(reader.iter_chunks([self.mcap_path], max_workers=1))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([(task_id, batch.num_rows) for task_id, batch in chunks], [('ok', 10)])
+
+    def test_missing_field_is_counted_per_file(self):
+        reader = McapReader([{'id': 'missing', 'topic_name': '/t', 'field_names': 'b', 'parse_string': 'b'}])
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            chunks = list(reader.iter_chunks([self.mcap_path], max_workers=1))
+        self.assertEqual(chunks, [])
+        # One line per message type, each counting its messages
+        counts = re.findall(r"Warning: Task 'missing' in '.*?': Failed to retrieve value for field 'b': .*? \((\d+) message\(s\)\)",
+                            stderr.getvalue())
+        self.assertEqual(counts, ['5', '5'])
+
+
+if __name__ == '__main__':
+    unittest.main()
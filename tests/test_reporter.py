@@ -0,0 +1,95 @@
+"""
+Checks that intermediate CSV files written by Reporter read back like the ones written
+with DataFrame.to_csv.
+
+Run from the repository root with: python -m unittest discover -s tests
+"""
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from mcap_analyzer.reporter import Reporter
+
+
+class IntermediateCsvTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write_chunks(self, task_id, batches):
+        reporter = Reporter(self.output_dir, 'csv')
+        for batch in batches:
+            reporter.save_intermediate(task_id, batch)
+        reporter.close_intermediates()
+        return self.output_dir / f"{task_id}.csv"
+
+    def assert_reads_back_like_pandas(self, task_id, batches):
+        csv_path = self.write_chunks(task_id, batches)
+        expected_path = self.output_dir / "expected.csv"
+        pd.concat([batch.to_pandas() for batch in batches]).to_csv(expected_path, index=False)
+        pd.testing.assert_frame_equal(pd.read_csv(csv_path), pd.read_csv(expected_path))
+        with open(csv_path) as actual, open(expected_path) as expected:
+            self.assertEqual(actual.readline(), expected.readline())
+
+    def test_integral_floats_and_nan(self):
+        batch = pa.RecordBatch.from_pydict({
+            "mcap_timestamp_ns": np.array([1, 2, 3, 4], dtype=np.int64),
+            "raw_twist.linear.x": np.array([10.0, -0.0, np.nan, 2.5]),
+            "parsed_value": np.array([36.0, 0.0, np.nan, 1e300]),
+        })
+        self.assert_reads_back_like_pandas("floats", [batch])
+
+    def test_chunks_with_differing_schemas(self):
+        first = pa.RecordBatch.from_pydict({"mcap_timestamp_ns": np.array([1, 2]), "parsed_value": np.array([1.0, 2.0])})
+        second = pa.RecordBatch.from_pydict({"mcap_timestamp_ns": np.array([3]), "parsed_value": np.array([3])})
+        self.assert_reads_back_like_pandas("schemas", [first, second])
+
+    def test_column_is_widened_across_chunks(self):
+        first = pa.RecordBatch.from_pydict({"mcap_timestamp_ns": np.array([1, 2]), "parsed_value": np.array([-1, -2])})
+        second = pa.RecordBatch.from_pydict({"mcap_timestamp_ns": np.array([3, 4]), "parsed_value": np.array([1.5, 2.0])})
+        self.assert_reads_back_like_pandas("widened", [first, second])
+
+    def test_binary_columns(self):
+        batch = pa.RecordBatch.from_pydict({"mcap_timestamp_ns": [1, 2], "raw_data": [b"\x00a", b"b,"], "parsed_value": [1.0, 2.0]})
+        self.assert_reads_back_like_pandas("binary", [batch])
+
+
+class IntermediateParquetTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_column_is_widened_across_chunks(self):
+        batches = [
+            pa.RecordBatch.from_pydict({"mcap_timestamp_ns": np.array([1, 2]), "parsed_value": np.array([-1, -2], dtype=np.int32)}),
+            pa.RecordBatch.from_pydict({"mcap_timestamp_ns": np.array([3]), "parsed_value": np.array([2**40])}),
+            pa.RecordBatch.from_pydict({"mcap_timestamp_ns": np.array([4, 5]), "parsed_value": np.array([1.5, 2.5])}),
+            pa.RecordBatch.from_pydict({"mcap_timestamp_ns": np.array([6]), "parsed_value": np.array([7])}),
+        ]
+        reporter = Reporter(self.output_dir, 'parquet')
+        for batch in batches:
+            reporter.save_intermediate("widened", batch)
+        reporter.close_intermediates()
+
+        table = pq.read_table(self.output_dir / "widened.parquet")
+        self.assertEqual(table.schema.field("parsed_value").type, pa.float64())
+        self.assertEqual(table.column("parsed_value").to_pylist(), [-1.0, -2.0, 2.0**40, 1.5, 2.5, 7.0])
+        self.assertEqual(table.column("mcap_timestamp_ns").to_pylist(), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(sorted(path.name for path in self.output_dir.iterdir()), ["widened.parquet"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Checks the statistics of TimestampAnalyzer and RunningStats against exact references
+computed with Fraction, on the Numba kernels (when numba is installed) and on the NumPy path.
+
+Run from the repository root with: python -m unittest discover -s tests
+"""
+import contextlib
+import math
+import unittest
+from fractions import Fraction
+from unittest import mock
+
+import numpy as np
+
+from mcap_analyzer.analysis import running_stats, timestamp_analyzer
+from mcap_analyzer.analysis.running_stats import RunningStats
+from mcap_analyzer.analysis.timestamp_analyzer import TimestampAnalyzer
+
+
+def _exact_stats(values):
+    """mean, std (ddof=1), min and max of exact (Fraction) values, rounded to float at the end."""
+    mean = sum(values, Fraction(0)) / len(values)
+    variance = sum(((value - mean) ** 2 for value in values), Fraction(0)) / (len(values) - 1)
+    return {"mean": float(mean), "std": math.sqrt(variance), "min": float(min(values)), "max": float(max(values))}
+
+
+def _paths():
+    """Names of the computation paths: the Numba kernels if numba is installed, and NumPy."""
+    return (['numba'] if running_stats._chunk_moments_kernel is not None else []) + ['numpy']
+
+
+@contextlib.contextmanager
+def _use_path(path):
+    """Runs the analyzers on the given path; 'numpy' disables the Numba kernels."""
+    with contextlib.ExitStack() as stack:
+        if path == 'numpy':
+            stack.enter_context(mock.patch.object(timestamp_analyzer, '_jitter_stats_kernel', None))
+            stack.enter_context(mock.patch.object(timestamp_analyzer, '_jitter_stats_int_kernel', None))
+            stack.enter_context(mock.patch.object(running_stats, '_chunk_moments_kernel', None))
+        yield
+
+
+class JitterExactTest(unittest.TestCase):
+    """The jitter/drift statistics against the deviation from the ideal grid computed in Fraction."""
+
+    def analyze(self, freq, timestamps_ns, path, num_chunks):
+        with _use_path(path):
+            analyzer = TimestampAnalyzer(f'timestamp(freq:{freq})')
+            for chunk in np.array_split(timestamps_ns, num_chunks):
+                analyzer.update(chunk)
+            return analyzer.finalize()
+
+    def assert_jitter_matches(self, freq, timestamps_ns):
+        period_ns = Fraction(10**9) / Fraction(freq)
+        t_start_ns = int(timestamps_ns[0])
+        deviations = [((int(t) - t_start_ns + period_ns / 2) % period_ns - period_ns / 2) / 10**9
+                      for t in timestamps_ns]
+        expected = _exact_stats(deviations)
+        for path in _paths():
+            for num_chunks in (1, 7):
+                with self.subTest(path=path, num_chunks=num_chunks):
+                    jitter = self.analyze(freq, timestamps_ns, path, num_chunks)["jitter_drift_s"]
+                    # The exact paths give the correctly rounded deviations; only the
+                    # summation of mean and M2 rounds
+                    self.assertEqual(jitter["min"], expected["min"])
+                    self.assertEqual(jitter["max"], expected["max"])
+                    self.assertAlmostEqual(jitter["mean"], expected["mean"], delta=1e-15)
+                    self.assertAlmostEqual(jitter["std"], expected["std"], delta=1e-15)
+
+    def make_timestamps(self, freq, size, offset_ns):
+        rng = np.random.default_rng(0)
+        grid = [offset_ns + int(i * Fraction(10**9) / Fraction(freq)) for i in range(size)]
+        return np.array(grid, dtype=np.int64) + rng.integers(-300_000, 300_000, size)
+
+    def test_30hz_with_leading_zero_stamp(self):
+        timestamps_ns = self.make_timestamps('30', 5000, 1_700_000_000_000_000_000)
+        timestamps_ns[0] = 0
+        self.assert_jitter_matches('30', timestamps_ns)
+
+    def test_30hz(self):
+        self.assert_jitter_matches('30', self.make_timestamps('30', 5000, 1_700_000_000_000_000_000))
+
+    def test_100hz_out_of_order(self):
+        timestamps_ns = self.make_timestamps('100', 5000, 1_700_000_000_000_000_000)
+        timestamps_ns[[10, 11]] = timestamps_ns[[11, 10]]
+        self.assert_jitter_matches('100', timestamps_ns)
+
+    def test_period_stats(self):
+        timestamps_ns = self.make_timestamps('30', 1000, 1_700_000_000_000_000_000)
+        periods = [Fraction(int(b) - int(a), 10**9) for a, b in zip(timestamps_ns[:-1], timestamps_ns[1:])]
+        expected = _exact_stats(periods)
+        for path in _paths():
+            with self.subTest(path=path):
+                result = self.analyze('30', timestamps_ns, path, 7)["period_s"]
+                for key in ("mean", "std", "min", "max"):
+                    self.assertAlmostEqual(result[key], expected[key], delta=1e-15)
+
+
+class RunningStatsTest(unittest.TestCase):
+    """Chunks merged with RunningStats.update/add_moments against the whole data at once."""
+
+    def assert_stats_match(self, chunks, std_rtol=1e-9):
+        values = np.concatenate(chunks)
+        values = values[~np.isnan(values)]
+        expected = _exact_stats([Fraction(float(value)) for value in values])
+        for path in _paths():
+            with self.subTest(path=path):
+                with _use_path(path):
+                    stats = RunningStats()
+                    for chunk in chunks:
+                        stats.update(chunk)
+                result = stats.to_dict()
+                self.assertEqual(result["min"], expected["min"])
+                self.assertEqual(result["max"], expected["max"])
+                self.assertAlmostEqual(result["mean"], expected["mean"], delta=abs(expected["mean"]) * 1e-14)
+                self.assertAlmostEqual(result["std"], expected["std"], delta=expected["std"] * std_rtol)
+
+    def test_large_offset(self):
+        # Plain sums of squares lose the variance of values with a large offset entirely. The
+        # mean is only known to about an ulp of the offset (2e-7), which bounds the accuracy of std.
+        rng = np.random.default_rng(0)
+        values = 1.7e9 + rng.normal(0.0, 1e-3, 10000)
+        self.assert_stats_match(np.array_split(values, 13), std_rtol=1e-4)
+
+    def test_uneven_chunks_with_nan(self):
+        rng = np.random.default_rng(1)
+        chunks = [rng.normal(5.0, 2.0, size) for size in (1, 1000, 3, 0, 250)]
+        chunks[2][1] = np.nan
+        chunks.append(np.array([np.nan, np.nan]))
+        self.assert_stats_match(chunks)
+
+    def test_integer_chunks(self):
+        self.assert_stats_match([np.arange(10, dtype=np.int64), np.array([-5, 2**40], dtype=np.int64)])
+
+    def test_add_moments(self):
+        stats = RunningStats()
+        stats.add_moments(0, 0.0, 0.0, np.inf, -np.inf)
+        stats.add_moments(2, 1.5, 0.5, 1.0, 2.0)      # [1, 2]
+        stats.add_moments(3, 10.0, 2.0, 9.0, 11.0)    # [9, 10, 11]
+        expected = _exact_stats([Fraction(value) for value in (1, 2, 9, 10, 11)])
+        result = stats.to_dict()
+        self.assertEqual((result["min"], result["max"]), (1.0, 11.0))
+        self.assertAlmostEqual(result["mean"], expected["mean"], places=12)
+        self.assertAlmostEqual(result["std"], expected["std"], places=12)
+
+    def test_empty(self):
+        result = RunningStats().to_dict()
+        self.assertTrue(all(np.isnan(value) for value in result.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()